@@ -0,0 +1,40 @@
+def post_to_dict(post):
+    image = post.thumbnail or (post.image.url if post.image else None)
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'pub_date': post.pub_date.isoformat(),
+        'author': post.author.username,
+        'group': post.group.slug if post.group_id else None,
+        'image': image,
+        'comments_count': getattr(post, 'comments_count', None),
+    }
+
+
+def group_to_dict(group):
+    return {
+        'slug': group.slug,
+        'title': group.title,
+        'description': group.description,
+    }
+
+
+def comment_to_dict(comment):
+    return {
+        'id': comment.pk,
+        'post': comment.post_id,
+        'author': comment.author.username,
+        'text': comment.text,
+        'created': comment.created.isoformat(),
+    }
+
+
+def author_to_dict(author, stats):
+    return {
+        'username': author.username,
+        'full_name': author.get_full_name(),
+        'posts_count': stats.posts_count,
+        'comments_count': stats.comments_count,
+        'followers_count': stats.followers_count,
+        'following_count': stats.following_count,
+    }
@@ -0,0 +1,143 @@
+import json
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+NUMBER_POSTS_FOR_TEST_API = 13
+
+
+class ApiViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        for number in range(NUMBER_POSTS_FOR_TEST_API):
+            cls.post = Post.objects.create(
+                author=cls.author,
+                text=f'Тестовый пост {number}',
+                group=cls.group,
+            )
+        Comment.objects.create(
+            author=cls.reader, post=cls.post, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_feeds_paginate_with_cursor(self):
+        """Ленты API листаются курсором и отдают компактный JSON."""
+        urls = [
+            reverse('api:post_list'),
+            reverse('api:group_posts', kwargs={'slug': self.group.slug}),
+            reverse('api:author_posts',
+                    kwargs={'username': self.author.username}),
+            reverse('api:follow_feed'),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.reader_client.get(url).json()
+                self.assertEqual(len(first['results']), 10)
+                self.assertEqual(first['results'][0]['id'], self.post.id)
+                self.assertEqual(first['results'][0]['comments_count'], 1)
+                second = self.reader_client.get(
+                    url, {'cursor': first['next_cursor']}).json()
+                self.assertEqual(len(second['results']), 3)
+                self.assertIsNone(second['next_cursor'])
+
+    def test_unchanged_feed_returns_not_modified(self):
+        """Повторный запрос с ETag получает 304, изменение ленты — 200."""
+        url = reverse('api:post_list')
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertFalse(response.has_header('Last-Modified'))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        self.post.text = 'Исправленный текст'
+        self.post.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.json()['results'][0]['text'],
+                         'Исправленный текст')
+
+    def test_comment_changes_etag_only_of_pages_with_its_post(self):
+        """Комментарий меняет ETag страницы со своим постом, но не других."""
+        url = reverse('api:post_list')
+        first = self.client.get(url)
+        second = self.client.get(url, {'cursor': first.json()['next_cursor']})
+        Comment.objects.create(
+            author=self.reader, post=self.post, text='Ещё комментарий'
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.json()['results'][0]['comments_count'], 2)
+        response = self.client.get(
+            url, {'cursor': first.json()['next_cursor']},
+            HTTP_IF_NONE_MATCH=second['ETag'],
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_follow_feed_changes_etag_on_unfollow(self):
+        """Отписка меняет ETag ленты подписок."""
+        url = reverse('api:follow_feed')
+        etag = self.reader_client.get(url)['ETag']
+        Follow.objects.filter(user=self.reader).delete()
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.json()['results'], [])
+
+    def test_follow_feed_requires_auth(self):
+        """Лента подписок недоступна анонимному пользователю."""
+        response = self.client.get(reverse('api:follow_feed'))
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+
+    def test_detail_endpoints(self):
+        """Пост, комментарии, группы и автор отдаются в JSON."""
+        response = self.client.get(
+            reverse('api:post_detail', kwargs={'post_id': self.post.id}))
+        self.assertEqual(response.json()['author'], self.author.username)
+        response = self.client.get(
+            reverse('api:comment_list', kwargs={'post_id': self.post.id}))
+        self.assertEqual(response.json()['results'][0]['text'],
+                         'Комментарий')
+        response = self.client.get(reverse('api:group_list'))
+        self.assertEqual(response.json()['results'][0]['slug'],
+                         self.group.slug)
+        response = self.client.get(reverse(
+            'api:author_detail', kwargs={'username': self.author.username}))
+        self.assertEqual(response.json()['posts_count'],
+                         NUMBER_POSTS_FOR_TEST_API)
+        response = self.client.get(
+            reverse('api:post_detail', kwargs={'post_id': 0}))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_api_is_read_only(self):
+        """API не принимает запросы на запись."""
+        response = self.reader_client.post(reverse('api:post_list'))
+        self.assertEqual(response.status_code, HTTPStatus.METHOD_NOT_ALLOWED)
+
+    def test_post_export_streams_all_posts(self):
+        """Выгрузка отдаёт все посты потоком и продолжается по cursor."""
+        url = reverse('api:post_export')
+        response = self.client.get(url)
+        self.assertTrue(response.streaming)
+        lines = [json.loads(line) for line in
+                 b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(len(lines), Post.objects.count())
+        self.assertEqual(lines[0]['id'], self.post.pk)
+        rest = self.client.get(url, {'cursor': lines[4]['cursor']})
+        ids = [json.loads(line)['id'] for line in
+               b''.join(rest.streaming_content).splitlines()]
+        self.assertEqual(ids, [line['id'] for line in lines[5:]])
@@ -0,0 +1,197 @@
+import hashlib
+import json
+
+from django.contrib.auth import get_user_model
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.views.decorators.http import require_safe
+
+from posts import caching, stats, streaming, timeline
+from posts.models import Comment, Group, Post
+from posts.paginators import CURSOR_PARAM, CursorPaginator, encode_cursor
+from posts.views import LIMIT_POSTS_ON_THE_PAGE
+
+from .serializers import (author_to_dict, comment_to_dict, group_to_dict,
+                          post_to_dict)
+
+User = get_user_model()
+
+API_MAX_LIMIT: int = 100
+API_EXPORT_CHUNK_SIZE: int = 500
+
+
+def json_response(data, status=200):
+    return JsonResponse(
+        data,
+        status=status,
+        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')},
+    )
+
+
+def error_response(detail, status):
+    return json_response({'detail': detail}, status=status)
+
+
+def page_limit(request):
+    try:
+        limit = int(request.GET.get('limit', LIMIT_POSTS_ON_THE_PAGE))
+    except ValueError:
+        return LIMIT_POSTS_ON_THE_PAGE
+    return max(1, min(limit, API_MAX_LIMIT))
+
+
+def make_etag(*parts):
+    digest = hashlib.sha1(':'.join(map(str, parts)).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def set_validators(response, etag):
+    response['ETag'] = etag
+    return response
+
+
+def feed_response(request, queryset, keys=(), serialize=post_to_dict,
+                  date_field='pub_date', newest_first=True,
+                  transform=None, depends=caching.post_keys):
+    """Страница ленты с валидатором для условного GET.
+
+    ETag считается по id записей страницы и поколениям, от которых она
+    зависит: keys и depends(page) — по умолчанию поколения постов
+    страницы и их групп. Комментарий к посту меняет ETag только тех
+    страниц, где этот пост виден. Неизменившаяся лента отдаёт 304 после
+    выборки страницы, без сериализации. Last-Modified не отдаётся:
+    правка поста или новый комментарий не меняют даты публикации,
+    и по If-Modified-Since клиент получал бы 304 на изменившуюся ленту.
+    """
+    paginator = CursorPaginator(
+        queryset, page_limit(request), date_field=date_field,
+        newest_first=newest_first,
+    )
+    page = paginator.get_page(request.GET.get(CURSOR_PARAM))
+    if transform is not None:
+        page = transform(page)
+    etag = make_etag(
+        request.get_full_path(),
+        ','.join(str(item.pk) for item in page),
+        caching.generations_digest(
+            [caching.SITE_GENERATION_KEY, *keys, *depends(page)]),
+    )
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+    response = json_response({
+        'results': [serialize(item) for item in page],
+        'next_cursor': page.next_cursor,
+        'previous_cursor': page.previous_cursor,
+    })
+    return set_validators(response, etag)
+
+
+def content_response(request, data):
+    """Ответ с ETag по содержимому для небольших объектов."""
+    response = json_response(data)
+    etag = make_etag(hashlib.sha1(response.content).hexdigest())
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+    return set_validators(response, etag)
+
+
+@require_safe
+def post_list(request):
+    return feed_response(request, Post.objects.feed())
+
+
+def _json_lines(rows):
+    for post in rows.iterator(chunk_size=API_EXPORT_CHUNK_SIZE):
+        data = post_to_dict(post)
+        data['cursor'] = encode_cursor(post.pub_date, post.pk)
+        yield json.dumps(data, ensure_ascii=False) + '\n'
+
+
+@require_safe
+def post_export(request):
+    """Все посты потоком JSON Lines, от новых к старым.
+
+    Каждая строка несёт свой cursor, так что выгрузку можно продолжить
+    с места обрыва.
+    """
+    paginator = CursorPaginator(Post.objects.feed(), API_EXPORT_CHUNK_SIZE)
+    rows = paginator.queryset_after(request.GET.get(CURSOR_PARAM))
+    return StreamingHttpResponse(
+        streaming.in_request_context(_json_lines(rows)),
+        content_type='application/x-ndjson',
+    )
+
+
+@require_safe
+def post_detail(request, post_id):
+    post = Post.objects.feed().filter(pk=post_id).first()
+    if post is None:
+        return error_response('Пост не найден', 404)
+    return content_response(request, post_to_dict(post))
+
+
+@require_safe
+def comment_list(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        return error_response('Пост не найден', 404)
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        'author').only('text', 'created', 'post', 'author__username')
+    return feed_response(
+        request, comments, [caching.post_key(post_id)],
+        serialize=comment_to_dict, date_field='created',
+        newest_first=False, depends=lambda page: (),
+    )
+
+
+@require_safe
+def group_list(request):
+    groups = Group.objects.order_by('title')
+    return content_response(
+        request, {'results': [group_to_dict(group) for group in groups]}
+    )
+
+
+@require_safe
+def group_posts(request, slug):
+    group = Group.objects.filter(slug=slug).first()
+    if group is None:
+        return error_response('Группа не найдена', 404)
+    return feed_response(
+        request, group.posts.feed(), [caching.group_key(group.pk)]
+    )
+
+
+@require_safe
+def author_detail(request, username):
+    author = User.objects.select_related('stats').filter(
+        username=username).first()
+    if author is None:
+        return error_response('Пользователь не найден', 404)
+    return content_response(
+        request, author_to_dict(author, stats.get_stats(author))
+    )
+
+
+@require_safe
+def author_posts(request, username):
+    author = User.objects.filter(username=username).first()
+    if author is None:
+        return error_response('Пользователь не найден', 404)
+    return feed_response(
+        request, Post.objects.feed().filter(author=author))
+
+
+@require_safe
+def follow_feed(request):
+    if not request.user.is_authenticated:
+        return error_response('Требуется авторизация', 401)
+    response = feed_response(
+        request,
+        timeline.follow_feed(request.user),
+        [caching.timeline_key(request.user.pk)],
+        transform=timeline.as_posts,
+    )
+    patch_vary_headers(response, ('Cookie',))
+    return response
@@ -0,0 +1,55 @@
+"""Загрузка пользователя из сессии через кэш.
+
+AuthenticationMiddleware на каждый запрос читает строку auth_user по id
+из сессии. CachedModelBackend хранит пользователя в кэше сессий и
+сбрасывает запись при сохранении или удалении пользователя, поэтому
+смена пароля по-прежнему разлогинивает остальные сессии.
+
+Сброс виден всем воркерам, только если кэш у них общий (file, memcached,
+Redis). С кэшем в памяти процесса (locmem, по умолчанию) остальные
+воркеры держали бы старого пользователя до истечения TTL, поэтому
+пользователь тогда читается из базы, как в ModelBackend.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+User = get_user_model()
+
+USER_CACHE_ALIAS = 'sessions'
+USER_CACHE_KEY = 'auth:user:{user_id}'
+USER_CACHE_TIMEOUT: int = 60 * 15
+
+
+def user_cache_key(user_id):
+    return USER_CACHE_KEY.format(user_id=user_id)
+
+
+def is_shared(cache):
+    """Кэш общий для воркеров, а не в памяти одного процесса."""
+    backend = getattr(cache, '_cache', cache)
+    return not isinstance(backend, LocMemCache)
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        cache = caches[USER_CACHE_ALIAS]
+        if not is_shared(cache):
+            return super().get_user(user_id)
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, USER_CACHE_TIMEOUT)
+            return user
+        return user if self.user_can_authenticate(user) else None
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_user(sender, instance, **kwargs):
+    caches[USER_CACHE_ALIAS].delete(user_cache_key(instance.pk))
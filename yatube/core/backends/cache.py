@@ -0,0 +1,39 @@
+"""Обёртка над бэкендом кэша, считающая попадания и промахи.
+
+Настоящий бэкенд и имя псевдонима передаются в OPTIONS (см.
+yatube.cache_config.instrument_caches); остальные параметры уходят
+бэкенду без изменений.
+"""
+from django.utils.module_loading import import_string
+
+from .. import metrics
+
+_missing = object()
+
+
+class InstrumentedCache:
+    def __init__(self, location, params):
+        params = dict(params)
+        options = dict(params.get('OPTIONS') or {})
+        self.alias = options.pop('ALIAS')
+        backend = import_string(options.pop('BACKEND'))
+        params['OPTIONS'] = options
+        self._cache = backend(location, params)
+
+    def __getattr__(self, name):
+        return getattr(self._cache, name)
+
+    def __contains__(self, key):
+        return key in self._cache
+
+    def get(self, key, default=None, version=None):
+        value = self._cache.get(key, _missing, version=version)
+        metrics.cache_lookup(self.alias, value is not _missing)
+        return default if value is _missing else value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        values = self._cache.get_many(keys, version=version)
+        for key in keys:
+            metrics.cache_lookup(self.alias, key in values)
+        return values
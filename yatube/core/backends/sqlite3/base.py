@@ -0,0 +1,60 @@
+"""SQLite с настройками для конкурентной записи.
+
+Подключается как ENGINE = 'core.backends.sqlite3'. При открытии соединения
+выполняются PRAGMA из DEFAULT_PRAGMAS, которые можно переопределить
+в DATABASES[...]['OPTIONS']['pragmas'] (None отключает PRAGMA, например
+journal_mode для реплики только на чтение). Транзакции atomic() начинаются
+с BEGIN IMMEDIATE: блокировка на запись берётся сразу и ждёт busy_timeout,
+а не падает с «database is locked» при повышении блокировки чтения
+посреди транзакции.
+"""
+import re
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -20000,
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY',
+}
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+def pragma_statements(pragmas):
+    statements = []
+    for name, value in pragmas.items():
+        if value is None:
+            continue
+        if not re.fullmatch(r'\w+', name) or not re.fullmatch(
+                r'-?\w+', str(value)):
+            raise ImproperlyConfigured(
+                f'Недопустимая PRAGMA SQLite: {name} = {value}'
+            )
+        statements.append(f'PRAGMA {name} = {value}')
+    return statements
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pragmas = {**DEFAULT_PRAGMAS, **params.pop('pragmas', {})}
+        self.transaction_mode = params.pop(
+            'transaction_mode', 'IMMEDIATE').upper()
+        if self.transaction_mode not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f'Недопустимый режим транзакций: {self.transaction_mode}'
+            )
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for statement in pragma_statements(self.pragmas):
+            conn.execute(statement)
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f'BEGIN {self.transaction_mode}')
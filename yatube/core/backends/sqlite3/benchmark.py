@@ -0,0 +1,114 @@
+"""Сравнение пропускной способности записи в SQLite.
+
+Несколько потоков одновременно выполняют транзакции, похожие
+на add_comment: чтение поста и вставка комментария. Один и тот же прогон
+делается на стандартном бэкенде Django и на core.backends.sqlite3.
+"""
+import os
+import tempfile
+import threading
+import time
+
+from django.db import DatabaseError
+from django.db.utils import load_backend
+
+BACKENDS = {
+    'django': 'django.db.backends.sqlite3',
+    'tuned': 'core.backends.sqlite3',
+}
+
+SCHEMA = (
+    'CREATE TABLE bench_post (id INTEGER PRIMARY KEY, text TEXT)',
+    'CREATE TABLE bench_comment (id INTEGER PRIMARY KEY, '
+    'post_id INTEGER REFERENCES bench_post (id), text TEXT)',
+    "INSERT INTO bench_post (id, text) VALUES (1, 'Обсуждаемый пост')",
+)
+
+
+def _wrapper(engine, path, alias):
+    settings_dict = {
+        'ENGINE': engine,
+        'NAME': path,
+        'OPTIONS': {},
+        'TIME_ZONE': None,
+        'AUTOCOMMIT': True,
+        'CONN_MAX_AGE': 0,
+        'ATOMIC_REQUESTS': False,
+        'USER': '',
+        'PASSWORD': '',
+        'HOST': '',
+        'PORT': '',
+        'TEST': {},
+    }
+    return load_backend(engine).DatabaseWrapper(settings_dict, alias)
+
+
+def _write(wrapper, post_id, number):
+    # То же, что делает atomic(): транзакция при включённом autocommit.
+    wrapper.set_autocommit(
+        False, force_begin_transaction_with_broken_autocommit=True
+    )
+    try:
+        with wrapper.cursor() as cursor:
+            cursor.execute(
+                'SELECT id FROM bench_post WHERE id = %s', [post_id]
+            )
+            cursor.fetchone()
+            cursor.execute(
+                'INSERT INTO bench_comment (post_id, text) VALUES (%s, %s)',
+                [post_id, f'Комментарий {number}'],
+            )
+        wrapper.commit()
+    except DatabaseError:
+        wrapper.rollback()
+        raise
+    finally:
+        wrapper.set_autocommit(True)
+
+
+def run(engine, workers=8, writes=200):
+    """Возвращает число записей, ошибок блокировки и записей в секунду."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.sqlite3')
+        setup = _wrapper(engine, path, 'bench_setup')
+        with setup.cursor() as cursor:
+            for statement in SCHEMA:
+                cursor.execute(statement)
+        setup.close()
+        committed = []
+        errors = []
+        barrier = threading.Barrier(workers)
+
+        def worker(index):
+            wrapper = _wrapper(engine, path, f'bench_{index}')
+            wrapper.ensure_connection()
+            barrier.wait()
+            done = failed = 0
+            for number in range(writes):
+                try:
+                    _write(wrapper, 1, number)
+                    done += 1
+                except DatabaseError:
+                    failed += 1
+            wrapper.close()
+            committed.append(done)
+            errors.append(failed)
+
+        threads = [threading.Thread(target=worker, args=(index,))
+                   for index in range(workers)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    return {
+        'committed': sum(committed),
+        'locked': sum(errors),
+        'writes_per_s': round(sum(committed) / elapsed, 1),
+    }
+
+
+def compare(workers=8, writes=200):
+    return {name: run(engine, workers, writes)
+            for name, engine in BACKENDS.items()}
@@ -0,0 +1,134 @@
+"""Проверки настроек, влияющих на производительность.
+
+Регистрируются с тегом performance как deploy-проверки, поэтому
+выполняются в ``manage.py check --deploy`` и командой perf_audit.
+"""
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+PERFORMANCE = 'performance'
+
+CACHED_LOADER = 'django.template.loaders.cached.Loader'
+GZIP_MIDDLEWARE = 'django.middleware.gzip.GZipMiddleware'
+MANIFEST_STORAGES = (
+    'django.contrib.staticfiles.storage.ManifestStaticFilesStorage',
+)
+LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+DEBUG_APPS = ('debug_toolbar', 'silk', 'django_extensions')
+DB_SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+
+
+def _uses_cached_loader(template_settings):
+    for loader in template_settings.get('OPTIONS', {}).get('loaders') or []:
+        name = loader[0] if isinstance(loader, (list, tuple)) else loader
+        if name == CACHED_LOADER:
+            return True
+    # Без явных loaders Django сам включает кэширующий загрузчик
+    # при DEBUG = False.
+    return (not template_settings.get('OPTIONS', {}).get('loaders')
+            and not settings.DEBUG)
+
+
+@register(PERFORMANCE, Tags.database, deploy=True)
+def check_database(app_configs, **kwargs):
+    warnings = []
+    for alias, database in settings.DATABASES.items():
+        if not database.get('CONN_MAX_AGE'):
+            warnings.append(Warning(
+                f'База {alias} открывает новое соединение на каждый запрос.',
+                hint='Задайте CONN_MAX_AGE > 0.',
+                id='core.W001',
+            ))
+        if database['ENGINE'] == 'django.db.backends.sqlite3':
+            warnings.append(Warning(
+                f'База {alias} использует стандартный бэкенд SQLite '
+                f'без WAL и BEGIN IMMEDIATE.',
+                hint="Укажите ENGINE = 'core.backends.sqlite3'.",
+                id='core.W002',
+            ))
+    return warnings
+
+
+@register(PERFORMANCE, Tags.templates, deploy=True)
+def check_templates(app_configs, **kwargs):
+    return [
+        Warning(
+            f'Шаблоны бэкенда {template["BACKEND"]} разбираются '
+            f'заново на каждый запрос.',
+            hint=f'Оберните загрузчики в {CACHED_LOADER}.',
+            id='core.W003',
+        )
+        for template in settings.TEMPLATES
+        if template['BACKEND'].endswith('DjangoTemplates')
+        and not _uses_cached_loader(template)
+    ]
+
+
+@register(PERFORMANCE, deploy=True)
+def check_static(app_configs, **kwargs):
+    if settings.STATICFILES_STORAGE in MANIFEST_STORAGES:
+        return []
+    return [Warning(
+        'У статических файлов нет хэшей в именах, их нельзя кэшировать '
+        'в браузере надолго.',
+        hint='Используйте ManifestStaticFilesStorage.',
+        id='core.W004',
+    )]
+
+
+@register(PERFORMANCE, deploy=True)
+def check_middleware(app_configs, **kwargs):
+    if GZIP_MIDDLEWARE in settings.MIDDLEWARE:
+        return []
+    return [Warning(
+        'Ответы отдаются без сжатия.',
+        hint=f'Добавьте {GZIP_MIDDLEWARE} первым в MIDDLEWARE или '
+             f'включите сжатие на прокси.',
+        id='core.W005',
+    )]
+
+
+@register(PERFORMANCE, deploy=True)
+def check_caches(app_configs, **kwargs):
+    return [
+        Warning(
+            f'Кэш {alias} живёт в памяти процесса и не общий для воркеров.',
+            hint='Задайте YATUBE_CACHE_BACKEND (file, memcached или redis).',
+            id='core.W006',
+        )
+        for alias, config in settings.CACHES.items()
+        # InstrumentedCache хранит настоящий бэкенд в OPTIONS.
+        if config.get('OPTIONS', {}).get('BACKEND', config['BACKEND'])
+        in LOCAL_CACHES
+    ]
+
+
+@register(PERFORMANCE, deploy=True)
+def check_debug(app_configs, **kwargs):
+    warnings = []
+    if settings.DEBUG:
+        warnings.append(Warning(
+            'DEBUG = True: каждый SQL-запрос сохраняется в памяти.',
+            id='core.W007',
+        ))
+    for app in DEBUG_APPS:
+        if app in settings.INSTALLED_APPS:
+            warnings.append(Warning(
+                f'Отладочное приложение {app} включено.',
+                id='core.W008',
+            ))
+    return warnings
+
+
+@register(PERFORMANCE, deploy=True)
+def check_sessions(app_configs, **kwargs):
+    if settings.SESSION_ENGINE != DB_SESSION_ENGINE:
+        return []
+    return [Warning(
+        'Сессии читаются из django_session на каждый запрос.',
+        hint='Задайте YATUBE_SESSION_BACKEND=cached_db или signed_cookies.',
+        id='core.W009',
+    )]
@@ -0,0 +1,142 @@
+"""Чтение с реплик и read-your-writes.
+
+ReplicaRouter отправляет чтения на реплики из settings.DATABASE_REPLICAS
+только внутри представлений, помеченных @use_replicas (ленты и страницы
+постов); всё остальное читается с основной базы. Сессии и пользователи
+для аутентификации всегда читаются с основной базы: устаревшая реплика
+разлогинила бы только что вошедшего посетителя.
+
+Пока идёт запрос, после первой записи чтения тоже уходят на основную
+базу, а ReplicaPinningMiddleware закрепляет посетителя за ней ещё на
+REPLICA_PIN_SECONDS, чтобы он видел свои изменения, даже если реплика
+отстаёт. Недоступная реплика исключается на
+REPLICA_RETRY_SECONDS, а без живых реплик чтения идут на основную базу.
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+REPLICA_PIN_SECONDS: int = 5
+REPLICA_RETRY_SECONDS: int = 30
+PRIMARY_ONLY_APPS = ('auth', 'sessions')
+
+_state = threading.local()
+_unavailable = {}
+
+
+def replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+def reset():
+    _state.__dict__.clear()
+
+
+def snapshot():
+    """Состояние маршрутизации текущего запроса."""
+    return dict(_state.__dict__)
+
+
+@contextmanager
+def restored(state):
+    """Восстанавливает маршрутизацию запроса для кода, который выполняется
+    после выхода из представления и middleware (потоковые ответы)."""
+    previous = snapshot()
+    _state.__dict__.clear()
+    _state.__dict__.update(state)
+    try:
+        yield
+    finally:
+        _state.__dict__.clear()
+        _state.__dict__.update(previous)
+
+
+def pin_primary():
+    _state.pinned = True
+
+
+def wrote():
+    return getattr(_state, 'wrote', False)
+
+
+def pinned():
+    """Запрос читает только с основной базы: посетитель закреплён за ней
+    или уже что-то записал."""
+    return getattr(_state, 'pinned', False) or wrote()
+
+
+def used_replica():
+    return getattr(_state, 'used_replica', False)
+
+
+def use_replicas(view):
+    """Разрешает представлению читать с реплик."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        previous = getattr(_state, 'replica_allowed', False)
+        _state.replica_allowed = True
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _state.replica_allowed = previous
+    return wrapper
+
+
+def available(alias):
+    retry_at = _unavailable.get(alias)
+    if retry_at is not None and retry_at > time.monotonic():
+        return False
+    try:
+        connections[alias].ensure_connection()
+    except DatabaseError:
+        _unavailable[alias] = time.monotonic() + getattr(
+            settings, 'REPLICA_RETRY_SECONDS', REPLICA_RETRY_SECONDS)
+        return False
+    _unavailable.pop(alias, None)
+    return True
+
+
+def choose_replica():
+    """Реплика выбирается один раз на запрос: реплики отстают по-разному,
+    и чтения одной страницы с разных реплик могли бы не сойтись."""
+    alias = getattr(_state, 'replica', None)
+    if alias is None:
+        candidates = [alias for alias in replicas() if available(alias)]
+        if not candidates:
+            return None
+        alias = _state.replica = random.choice(candidates)
+    return alias
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if (not getattr(_state, 'replica_allowed', False)
+                or pinned()
+                or model._meta.app_label in PRIMARY_ONLY_APPS):
+            return DEFAULT_DB_ALIAS
+        alias = choose_replica()
+        if alias is None:
+            return DEFAULT_DB_ALIAS
+        _state.used_replica = True
+        return alias
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Реплики получают схему и данные копированием с основной базы.
+        if db in replicas():
+            return False
+        return None
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from core.backends.sqlite3 import benchmark
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает конкурентную запись в SQLite на стандартном '
+            'и настроенном бэкенде.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8,
+                            help='Число пишущих потоков.')
+        parser.add_argument('--writes', type=int, default=200,
+                            help='Транзакций на поток.')
+
+    def handle(self, *args, **options):
+        results = benchmark.compare(options['workers'], options['writes'])
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:>8}: {result["committed"]} записей, '
+                f'{result["locked"]} ошибок блокировки, '
+                f'{result["writes_per_s"]} записей/с'
+            )
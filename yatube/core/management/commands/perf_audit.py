@@ -0,0 +1,22 @@
+from django.core import checks
+from django.core.management.base import BaseCommand, CommandError
+
+from core.checks import PERFORMANCE
+
+
+class Command(BaseCommand):
+    help = ('Проверяет настройки, влияющие на производительность: '
+            'соединения с БД, загрузчики шаблонов, статику, сжатие, '
+            'кэши и отладку.')
+
+    def handle(self, *args, **options):
+        issues = checks.run_checks(
+            tags=[PERFORMANCE], include_deployment_checks=True
+        )
+        for issue in issues:
+            self.stdout.write(self.style.WARNING(f'{issue.id}: {issue.msg}'))
+            if issue.hint:
+                self.stdout.write(f'    {issue.hint}')
+        if issues:
+            raise CommandError(f'Найдено проблем: {len(issues)}')
+        self.stdout.write(self.style.SUCCESS('Проблем не найдено'))
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core import tasks
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди в базе данных.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и завершиться.',
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=1.0,
+            help='Пауза в секундах, когда очередь пуста.',
+        )
+        parser.add_argument(
+            '--batch', type=int, default=tasks.TASK_BATCH_SIZE,
+            help='Сколько задач забирать за раз.',
+        )
+
+    def handle(self, *args, **options):
+        tasks.discover()
+        total_done = total_failed = 0
+        while True:
+            close_old_connections()
+            done, failed = tasks.run_pending(options['batch'])
+            total_done += done
+            total_failed += failed
+            if options['once'] and not done + failed:
+                break
+            if not done + failed:
+                time.sleep(options['sleep'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Выполнено задач: {total_done}, с ошибкой: {total_failed}'
+        ))
@@ -0,0 +1,35 @@
+import sqlite3
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+def replica_path(name):
+    if name.startswith('file:'):
+        return urlsplit(name).path
+    return name
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную базу SQLite в файлы реплик — замена '
+            'репликации для локальной проверки чтения с реплик.')
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError(
+                'Копирование поддерживается только для SQLite; '
+                'реплики других СУБД наполняет их собственная репликация.'
+            )
+        primary.ensure_connection()
+        for alias in settings.DATABASE_REPLICAS:
+            path = replica_path(connections.databases[alias]['NAME'])
+            connections[alias].close()
+            target = sqlite3.connect(path)
+            try:
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(self.style.SUCCESS(f'{alias}: {path}'))
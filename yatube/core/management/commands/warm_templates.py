@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.template_warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = ('Компилирует все шаблоны проекта и приложений; '
+            'завершается ошибкой, если какой-то шаблон не разбирается.')
+
+    def handle(self, *args, **options):
+        loaded, errors = warm_up()
+        for name, error in errors.items():
+            self.stderr.write(f'{name}: {error}')
+        if errors:
+            raise CommandError(f'Шаблонов с ошибками: {len(errors)}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Скомпилировано шаблонов: {loaded}'
+        ))
@@ -0,0 +1,224 @@
+"""Метрики запросов: Server-Timing и экспорт в формате Prometheus.
+
+ServerTimingMiddleware заводит на время запроса RequestMetrics, куда
+пишут обёртка выполнения SQL, бэкенд шаблонов и обёртка кэша. После
+ответа значения попадают в гистограммы по имени представления, которые
+отдаёт /metrics.
+
+Гистограммы живут в памяти процесса: у каждого воркера gunicorn свои
+значения, поэтому Prometheus должен опрашивать воркеры по отдельности
+(или приложение запускается одним процессом с потоками).
+"""
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', r'\\').replace(
+            '"', r'\"').replace('\n', r'\n'))
+        for name, value in zip(names, values)
+    )
+    return '{' + pairs + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.values = {}
+
+    def inc(self, labels, amount=1):
+        with _lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in sorted(self.values.items()):
+            yield f'{self.name}{_labels(self.labels, labels)} {value}'
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, buckets, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self.labels = labels
+        self.values = {}
+
+    def observe(self, labels, value):
+        with _lock:
+            counts, total, count = self.values.get(
+                labels, ([0] * len(self.buckets), 0, 0))
+            counts = [
+                number + (value <= bound)
+                for number, bound in zip(counts, self.buckets)
+            ]
+            self.values[labels] = (counts, total + value, count + 1)
+
+    def samples(self):
+        names = self.labels + ('le',)
+        for labels, (counts, total, count) in sorted(self.values.items()):
+            for bound, number in zip(self.buckets, counts):
+                yield (f'{self.name}_bucket'
+                       f'{_labels(names, labels + (_number(bound),))} '
+                       f'{number}')
+            yield (f'{self.name}_bucket{_labels(names, labels + ("+Inf",))}'
+                   f' {count}')
+            yield f'{self.name}_sum{_labels(self.labels, labels)} {total}'
+            yield f'{self.name}_count{_labels(self.labels, labels)} {count}'
+
+
+REQUEST_DURATION = Histogram(
+    'yatube_request_duration_seconds',
+    'Время обработки запроса представлением.',
+    LATENCY_BUCKETS, ('view',),
+)
+DB_QUERIES = Histogram(
+    'yatube_db_queries',
+    'Число SQL-запросов за один HTTP-запрос.',
+    QUERY_BUCKETS, ('view',),
+)
+DB_DURATION = Histogram(
+    'yatube_db_duration_seconds',
+    'Суммарное время SQL-запросов за один HTTP-запрос.',
+    LATENCY_BUCKETS, ('view',),
+)
+TEMPLATE_DURATION = Histogram(
+    'yatube_template_render_seconds',
+    'Суммарное время рендеринга шаблонов за один HTTP-запрос.',
+    LATENCY_BUCKETS, ('view',),
+)
+CACHE_LOOKUPS = Counter(
+    'yatube_cache_lookups_total',
+    'Чтения из кэша по результату.',
+    ('view', 'alias', 'result'),
+)
+RESPONSES = Counter(
+    'yatube_responses_total',
+    'Ответы по представлению и коду статуса.',
+    ('view', 'status'),
+)
+REGISTRY = (
+    REQUEST_DURATION, DB_QUERIES, DB_DURATION, TEMPLATE_DURATION,
+    CACHE_LOOKUPS, RESPONSES,
+)
+
+
+class RequestMetrics:
+    """Счётчики одного HTTP-запроса."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.cache = defaultdict(int)
+
+    def __call__(self, execute, sql, params, many, context):
+        # Сигнатура connection.execute_wrapper().
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - started
+
+    def server_timing(self, total):
+        hits = sum(number for (_, hit), number in self.cache.items() if hit)
+        misses = sum(
+            number for (_, hit), number in self.cache.items() if not hit)
+        return ', '.join([
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f};desc="templates"',
+            f'cache;desc="hit={hits} miss={misses}"',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+
+def start():
+    _local.request = RequestMetrics()
+    return _local.request
+
+
+def finish():
+    _local.request = None
+
+
+def current():
+    return getattr(_local, 'request', None)
+
+
+@contextmanager
+def resumed(request_metrics):
+    """Возвращает счётчики запроса коду, который выполняется уже после
+    выхода из представления, — генератору потокового ответа."""
+    previous = current()
+    _local.request = request_metrics
+    try:
+        yield request_metrics
+    finally:
+        _local.request = previous
+
+
+def cache_lookup(alias, hit):
+    metrics = current()
+    if metrics is not None:
+        metrics.cache[alias, hit] += 1
+
+
+@contextmanager
+def template_timer():
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics = current()
+        if metrics is not None:
+            metrics.template_time += time.perf_counter() - started
+
+
+def record(view, status, metrics, total):
+    """Переносит счётчики запроса в гистограммы процесса."""
+    labels = (view,)
+    REQUEST_DURATION.observe(labels, total)
+    DB_QUERIES.observe(labels, metrics.queries)
+    DB_DURATION.observe(labels, metrics.db_time)
+    TEMPLATE_DURATION.observe(labels, metrics.template_time)
+    RESPONSES.inc((view, str(status)))
+    for (alias, hit), number in metrics.cache.items():
+        CACHE_LOOKUPS.inc((view, alias, 'hit' if hit else 'miss'), number)
+
+
+def render():
+    """Все метрики в текстовом формате Prometheus."""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        lines.extend(metric.samples())
+    return '\n'.join(lines) + '\n'
+
+
+def reset():
+    with _lock:
+        for metric in REGISTRY:
+            metric.values.clear()
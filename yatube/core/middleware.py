@@ -0,0 +1,113 @@
+import logging
+import time
+
+from django.conf import settings
+
+from . import db_router, metrics, query_inspector
+
+logger = logging.getLogger(__name__)
+
+PIN_COOKIE = 'primary_db'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+class ReplicaPinningMiddleware:
+    """Закрепляет за основной базой посетителя, который только что писал."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        db_router.reset()
+        if request.COOKIES.get(PIN_COOKIE):
+            db_router.pin_primary()
+        try:
+            response = self.get_response(request)
+            wrote = db_router.wrote()
+        finally:
+            db_router.reset()
+        if wrote or request.method not in SAFE_METHODS:
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=getattr(settings, 'REPLICA_PIN_SECONDS',
+                                db_router.REPLICA_PIN_SECONDS),
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+
+def shows_server_timing(request):
+    if settings.DEBUG:
+        return True
+    # Без cookie сессии посетитель — аноним, сессию не загружаем.
+    if settings.SESSION_COOKIE_NAME not in request.COOKIES:
+        return False
+    user = getattr(request, 'user', None)
+    return user is not None and user.is_staff
+
+
+class ServerTimingMiddleware:
+    """Считает время, SQL, шаблоны и кэш запроса для /metrics.
+
+    Сотрудникам (и всем при DEBUG) итог отдаётся в заголовке
+    Server-Timing, который показывает вкладка Network в DevTools.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_metrics = metrics.start()
+        started = time.perf_counter()
+        try:
+            with query_inspector.wrap_connections(request_metrics):
+                response = self.get_response(request)
+            total = time.perf_counter() - started
+            match = request.resolver_match
+            view = match.view_name if match else 'unresolved'
+            if response.streaming:
+                # Посты потокового ответа читаются уже после выхода
+                # из middleware; счётчики попадают в гистограммы, когда
+                # ответ отдан целиком.
+                response.streaming_content = self._record_after(
+                    response.streaming_content, view, response.status_code,
+                    request_metrics, started)
+            else:
+                metrics.record(view, response.status_code, request_metrics,
+                               total)
+        finally:
+            metrics.finish()
+        if shows_server_timing(request):
+            response['Server-Timing'] = request_metrics.server_timing(total)
+        return response
+
+    @staticmethod
+    def _record_after(content, view, status, request_metrics, started):
+        try:
+            yield from content
+        finally:
+            metrics.record(view, status, request_metrics,
+                           time.perf_counter() - started)
+
+
+class QueryInspectorMiddleware:
+    """Пишет в лог запросы, повторившиеся за ответ (признак N+1).
+
+    Включается в настройках разработки; порог —
+    QUERY_INSPECTOR_THRESHOLD.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = query_inspector.QueryRecorder()
+        with query_inspector.wrap_connections(recorder):
+            response = self.get_response(request)
+        report = recorder.report(getattr(
+            settings, 'QUERY_INSPECTOR_THRESHOLD',
+            query_inspector.DUPLICATE_THRESHOLD))
+        if report:
+            logger.warning('%s %s: %s запросов\n%s', request.method,
+                           request.get_full_path(), recorder.count, report)
+        return response
@@ -0,0 +1,122 @@
+"""Поиск N+1 и повторяющихся запросов.
+
+Каждый SQL-запрос сводится к отпечатку: литералы и списки IN заменяются
+на ?, поэтому «SELECT ... FROM auth_user WHERE id = 1» и «... id = 2»
+дают один отпечаток. Отпечаток, повторившийся за запрос не меньше
+порога раз, — признак N+1; в отчёт попадает место, откуда шли запросы:
+строка шаблона или строка кода проекта.
+
+QueryInspectorMiddleware пишет такие отчёты в лог при разработке,
+а query_budget() роняет тест, если представление выходит за бюджет.
+"""
+import os
+import re
+import sys
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.template.base import Node
+
+DUPLICATE_THRESHOLD: int = 5
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%s|\?')
+_IN_LIST = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_SPACES = re.compile(r'\s+')
+_SKIP_PATHS = (
+    os.path.dirname(__file__) + os.sep + 'query_inspector.py',
+    os.sep + 'site-packages' + os.sep,
+    os.sep + 'django' + os.sep,
+)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def fingerprint(sql):
+    """Форма запроса без конкретных значений."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+def origin(frame):
+    """Строка шаблона или кода проекта, из которой выполнен запрос."""
+    code_line = None
+    while frame is not None:
+        node = frame.f_locals.get('self')
+        # type(), а не isinstance(): isinstance вычисляет ленивые объекты.
+        if issubclass(type(node), Node) and getattr(node, 'token', None):
+            name = node.origin.template_name or node.origin.name
+            return f'{name}:{node.token.lineno}'
+        path = frame.f_code.co_filename
+        if code_line is None and path.startswith(str(settings.BASE_DIR)) \
+                and not any(part in path for part in _SKIP_PATHS):
+            code_line = (f'{os.path.relpath(path, settings.BASE_DIR)}:'
+                         f'{frame.f_lineno}')
+        frame = frame.f_back
+    return code_line or 'unknown'
+
+
+class QueryRecorder:
+    """Обёртка выполнения SQL, собирающая отпечатки и их источники."""
+
+    def __init__(self):
+        self.count = 0
+        self.shapes = defaultdict(list)
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        self.shapes[fingerprint(sql)].append(origin(sys._getframe(1)))
+        return execute(sql, params, many, context)
+
+    def duplicates(self, threshold=DUPLICATE_THRESHOLD):
+        """Отпечатки, повторившиеся не меньше threshold раз, по убыванию."""
+        repeated = [
+            (len(origins), shape, sorted(set(origins)))
+            for shape, origins in self.shapes.items()
+            if len(origins) >= threshold
+        ]
+        return sorted(repeated, key=lambda item: -item[0])
+
+    def report(self, threshold=DUPLICATE_THRESHOLD):
+        lines = []
+        for count, shape, origins in self.duplicates(threshold):
+            lines.append(f'{count} × {shape}')
+            lines.extend(f'    из {place}' for place in origins)
+        return '\n'.join(lines)
+
+
+@contextmanager
+def wrap_connections(wrapper):
+    """Подключает обёртку выполнения SQL ко всем соединениям."""
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(wrapper))
+        yield wrapper
+
+
+@contextmanager
+def query_budget(max_queries, threshold=DUPLICATE_THRESHOLD):
+    """Роняет тест, если запросов больше бюджета или есть N+1.
+
+        with query_budget(6):
+            self.client.get(reverse('posts:index'))
+    """
+    with wrap_connections(QueryRecorder()) as recorder:
+        yield recorder
+    problems = []
+    if recorder.count > max_queries:
+        problems.append(
+            f'Выполнено {recorder.count} запросов при бюджете {max_queries}')
+    report = recorder.report(threshold)
+    if report:
+        problems.append(f'Повторяющиеся запросы:\n{report}')
+    if problems:
+        raise QueryBudgetExceeded('\n'.join(problems))
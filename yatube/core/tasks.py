@@ -0,0 +1,122 @@
+"""Очередь фоновых задач в базе данных.
+
+Представления и сигналы ставят задачи через enqueue(), а выполняет их
+``manage.py run_worker``. Если изменение, породившее задачу, идёт
+в transaction.atomic() (так пишут представления), строка задачи
+фиксируется вместе с ним: задача не теряется и не видна воркеру
+до коммита. Вне транзакции задача пишется отдельным запросом после
+изменения. Задачи должны быть идемпотентными: после ошибки
+задача повторяется с экспоненциальной задержкой, а после TASK_MAX_ATTEMPTS
+попыток остаётся в таблице со статусом failed.
+
+При TASKS_EAGER = True (по умолчанию для разработки и тестов) задачи
+выполняются сразу в вызывающем коде.
+"""
+import json
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+TASK_MAX_ATTEMPTS: int = 5
+TASK_RETRY_DELAY: int = 10
+TASK_LOCK_TIMEOUT: int = 60 * 10
+TASK_BATCH_SIZE: int = 50
+
+registry = {}
+
+
+def task(func):
+    """Регистрирует функцию как задачу под именем module.function."""
+    func.task_name = f'{func.__module__}.{func.__name__}'
+    registry[func.task_name] = func
+    return func
+
+
+def is_eager():
+    return getattr(settings, 'TASKS_EAGER', True)
+
+
+def enqueue(func, *args):
+    """Ставит задачу в очередь или выполняет её сразу в режиме eager."""
+    if is_eager():
+        return func(*args)
+    Task.objects.create(name=func.task_name, args=json.dumps(args))
+    return None
+
+
+def discover():
+    autodiscover_modules('tasks')
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=TASK_RETRY_DELAY * 2 ** (attempts - 1))
+
+
+def claim(limit=TASK_BATCH_SIZE):
+    """Забирает готовые задачи, включая зависшие у упавшего воркера.
+
+    Задача достаётся тому воркеру, чей условный UPDATE её изменил,
+    поэтому несколько воркеров не выполнят одну задачу дважды.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=TASK_LOCK_TIMEOUT)
+    ready = Task.objects.filter(
+        Q(status=Task.PENDING, run_at__lte=now)
+        | Q(status=Task.RUNNING, locked_at__lt=stale)
+    )
+    claimed = []
+    for task_id, status in ready.order_by('run_at', 'pk').values_list(
+            'pk', 'status')[:limit]:
+        updated = Task.objects.filter(pk=task_id, status=status).filter(
+            Q(status=Task.PENDING) | Q(locked_at__lt=stale)
+        ).update(status=Task.RUNNING, locked_at=now)
+        if updated:
+            claimed.append(task_id)
+    return list(Task.objects.filter(pk__in=claimed).order_by('run_at', 'pk'))
+
+
+def execute(job):
+    """Выполняет задачу; возвращает True при успехе."""
+    func = registry.get(job.name)
+    try:
+        if func is None:
+            raise LookupError(f'Неизвестная задача {job.name}')
+        with transaction.atomic():
+            func(*json.loads(job.args))
+    except Exception:
+        job.attempts += 1
+        job.last_error = traceback.format_exc()
+        job.locked_at = None
+        if job.attempts >= TASK_MAX_ATTEMPTS:
+            job.status = Task.FAILED
+            logger.error('Задача %s не выполнена:\n%s', job, job.last_error)
+        else:
+            job.status = Task.PENDING
+            job.run_at = timezone.now() + retry_delay(job.attempts)
+        job.save(update_fields=[
+            'attempts', 'last_error', 'locked_at', 'status', 'run_at'
+        ])
+        return False
+    job.delete()
+    return True
+
+
+def run_pending(limit=TASK_BATCH_SIZE):
+    """Выполняет одну пачку задач; возвращает (успешных, с ошибкой)."""
+    done = failed = 0
+    for job in claim(limit):
+        if execute(job):
+            done += 1
+        else:
+            failed += 1
+    return done, failed
@@ -0,0 +1,52 @@
+"""Предварительная компиляция шаблонов.
+
+С кэширующим загрузчиком шаблон разбирается при первом обращении
+и дальше берётся из памяти процесса. warm_up() обходит каталоги всех
+загрузчиков и загружает каждый шаблон заранее, чтобы первый запрос
+после деплоя не платил за разбор base.html, post_list.html и остальных.
+"""
+import os
+
+from django.template import TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+
+TEMPLATE_EXTENSIONS = ('.html', '.txt', '.xml')
+
+
+def _loader_dirs(engine):
+    for loader in engine.engine.template_loaders:
+        # cached.Loader хранит настоящие загрузчики в .loaders.
+        for inner in getattr(loader, 'loaders', [loader]):
+            get_dirs = getattr(inner, 'get_dirs', None)
+            if get_dirs is not None:
+                yield from get_dirs()
+
+
+def template_names(engine):
+    names = set()
+    for directory in _loader_dirs(engine):
+        directory = str(directory)
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                if filename.endswith(TEMPLATE_EXTENSIONS):
+                    path = os.path.join(root, filename)
+                    names.add(os.path.relpath(path, directory).replace(
+                        os.sep, '/'))
+    return sorted(names)
+
+
+def warm_up():
+    """Компилирует все шаблоны; возвращает число загруженных и ошибки."""
+    loaded = 0
+    errors = {}
+    for engine in engines.all():
+        if not isinstance(engine, DjangoTemplates):
+            continue
+        for name in template_names(engine):
+            try:
+                engine.get_template(name)
+            except TemplateSyntaxError as error:
+                errors[name] = str(error)
+            else:
+                loaded += 1
+    return loaded, errors
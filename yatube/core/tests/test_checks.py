@@ -0,0 +1,68 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, override_settings
+
+from ..checks import (check_caches, check_database, check_debug,
+                      check_middleware, check_sessions, check_static,
+                      check_templates)
+
+PROD_TEMPLATES = [{
+    'BACKEND': 'django.template.backends.django.DjangoTemplates',
+    'DIRS': [],
+    'OPTIONS': {
+        'loaders': [('django.template.loaders.cached.Loader', [
+            'django.template.loaders.app_directories.Loader',
+        ])],
+    },
+}]
+
+
+class PerformanceChecksTests(SimpleTestCase):
+    def ids(self, *checks):
+        return {issue.id for check in checks for issue in check(None)}
+
+    def test_dev_settings_reported(self):
+        """Настройки разработки не проходят аудит."""
+        with override_settings(
+                DEBUG=True,
+                SESSION_ENGINE='django.contrib.sessions.backends.db'):
+            ids = self.ids(check_database, check_templates, check_static,
+                           check_middleware, check_caches, check_debug,
+                           check_sessions)
+        self.assertEqual(
+            ids,
+            {'core.W001', 'core.W003', 'core.W004', 'core.W005',
+             'core.W006', 'core.W007', 'core.W009'},
+        )
+
+    @override_settings(
+        DEBUG=False,
+        TEMPLATES=PROD_TEMPLATES,
+        STATICFILES_STORAGE=(
+            'django.contrib.staticfiles.storage.ManifestStaticFilesStorage'
+        ),
+        MIDDLEWARE=['django.middleware.gzip.GZipMiddleware'],
+        CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': '/tmp/yatube-test-cache',
+        }},
+        DATABASES={'default': {
+            'ENGINE': 'core.backends.sqlite3',
+            'NAME': ':memory:',
+            'CONN_MAX_AGE': 60,
+        }},
+    )
+    def test_prod_settings_pass(self):
+        """Боевые настройки проходят все проверки производительности."""
+        self.assertEqual(
+            self.ids(check_database, check_templates, check_static,
+                     check_middleware, check_caches, check_debug,
+                     check_sessions),
+            set(),
+        )
+
+    def test_perf_audit_fails_on_issues(self):
+        with self.assertRaises(CommandError):
+            call_command('perf_audit', stdout=StringIO())
@@ -0,0 +1,142 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from posts import caching
+from posts.models import Post
+
+from .. import db_router
+from ..middleware import PIN_COOKIE
+
+User = get_user_model()
+
+REPLICA = 'replica_test'
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    """Основная база — тестовая SQLite, реплика — отдельный файл."""
+
+    databases = {'default', REPLICA}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.replica_path = os.path.join(cls.directory.name, 'replica.db')
+        connections.databases[REPLICA] = {
+            'ENGINE': 'core.backends.sqlite3',
+            'NAME': cls.replica_path,
+        }
+        cls.replicas = override_settings(DATABASE_REPLICAS=[REPLICA])
+        cls.replicas.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.replicas.disable()
+        connections[REPLICA].close()
+        del connections.databases[REPLICA]
+        cls.directory.cleanup()
+
+    def setUp(self):
+        cache.clear()
+        db_router._unavailable.clear()
+        self.author = User.objects.create(username='Автор')
+        Post.objects.create(author=self.author, text='Уже на реплике')
+        call_command('sync_replicas', stdout=StringIO())
+        # Этот пост реплика ещё не получила.
+        Post.objects.create(author=self.author, text='Только на основной')
+
+    def test_feed_reads_replica_until_visitor_writes(self):
+        """Лента читается с реплики, а после записи — с основной базы."""
+        self.client.force_login(self.author)
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Уже на реплике')
+        self.assertNotContains(response, 'Только на основной')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+        post = Post.objects.first()
+        response = self.client.post(
+            reverse('posts:add_comment', kwargs={'post_id': post.pk}),
+            {'text': 'Комментарий'},
+        )
+        self.assertIn(PIN_COOKIE, response.cookies)
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Только на основной')
+
+    def test_unavailable_replica_falls_back_to_primary(self):
+        settings_dict = connections.databases[REPLICA]
+        connections[REPLICA].close()
+        settings_dict['NAME'] = 'file:/nonexistent/replica.db?mode=ro'
+        try:
+            response = self.client.get(reverse('posts:index'))
+        finally:
+            connections[REPLICA].close()
+            settings_dict['NAME'] = self.replica_path
+        self.assertContains(response, 'Только на основной')
+        self.assertIn(REPLICA, db_router._unavailable)
+
+    def test_writes_and_other_views_use_primary(self):
+        router = db_router.ReplicaRouter()
+        self.assertEqual(router.db_for_read(Post), 'default')
+        self.assertEqual(router.db_for_write(Post), 'default')
+        self.assertFalse(router.allow_migrate(REPLICA, 'posts'))
+
+    def test_sessions_and_users_read_from_primary(self):
+        db_router.reset()
+        router = db_router.ReplicaRouter()
+        view = db_router.use_replicas(
+            lambda request: (router.db_for_read(Post),
+                             router.db_for_read(User)))
+        self.assertEqual(view(None), (REPLICA, 'default'))
+
+    def test_one_replica_per_request(self):
+        """Все чтения запроса идут на одну и ту же реплику."""
+        second = REPLICA + '_second'
+        connections.databases[second] = dict(connections.databases[REPLICA])
+        db_router.reset()
+        router = db_router.ReplicaRouter()
+        view = db_router.use_replicas(
+            lambda request: {router.db_for_read(Post) for _ in range(20)})
+        try:
+            with override_settings(DATABASE_REPLICAS=[REPLICA, second]):
+                self.assertEqual(len(view(None)), 1)
+        finally:
+            db_router.reset()
+            connections[second].close()
+            del connections.databases[second]
+
+    def test_fragment_from_replica_lives_pin_window(self):
+        """Фрагмент, собранный по реплике, живёт не дольше окна закрепления."""
+        db_router.reset()
+        self.assertEqual(caching.fragment_timeout(caching.PAGE_CACHE_TIMEOUT),
+                         caching.PAGE_CACHE_TIMEOUT)
+        view = db_router.use_replicas(
+            lambda request: list(Post.objects.all()))
+        try:
+            view(None)
+            self.assertEqual(
+                caching.fragment_timeout(caching.PAGE_CACHE_TIMEOUT),
+                db_router.REPLICA_PIN_SECONDS)
+        finally:
+            db_router.reset()
+
+    def test_stream_reads_replica(self):
+        """Посты потоковой ленты читаются уже после выхода из представления,
+        но по тем же правилам маршрутизации."""
+        response = self.client.get(reverse('posts:index'), {'stream': '1'})
+        html = b''.join(response.streaming_content).decode()
+        self.assertIn('Уже на реплике', html)
+        self.assertNotIn('Только на основной', html)
+
+        self.client.cookies[PIN_COOKIE] = '1'
+        response = self.client.get(reverse('posts:index'), {'stream': '1'})
+        html = b''.join(response.streaming_content).decode()
+        self.assertIn('Только на основной', html)
@@ -0,0 +1,105 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post
+
+from .. import metrics
+
+User = get_user_model()
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username='Админ', is_staff=True)
+        cls.author = User.objects.create_user(username='Автор')
+        Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        metrics.reset()
+        for alias in ('default', 'fragments'):
+            caches[alias].clear()
+
+    def test_server_timing_for_staff(self):
+        """Сотрудник видит в Server-Timing SQL, шаблоны и кэш."""
+        self.client.force_login(self.staff)
+        header = self.client.get(reverse('posts:index'))['Server-Timing']
+        for part in ('db;dur=', 'queries"', 'tpl;dur=', 'cache;desc="hit=',
+                     'total;dur='):
+            with self.subTest(part=part):
+                self.assertIn(part, header)
+
+    def test_no_server_timing_for_visitors(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.client.force_login(self.author)
+        response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_requests_aggregated_by_view(self):
+        """Запросы попадают в гистограммы по имени представления."""
+        for _ in range(2):
+            self.client.get(reverse('posts:index'))
+        labels = ('posts:index',)
+        self.assertEqual(metrics.REQUEST_DURATION.values[labels][2], 2)
+        self.assertGreater(metrics.DB_QUERIES.values[labels][1], 0)
+        self.assertGreater(metrics.TEMPLATE_DURATION.values[labels][1], 0)
+        self.assertEqual(metrics.RESPONSES.values['posts:index', '200'], 2)
+        self.assertIn(('posts:index', 'fragments', 'hit'),
+                      metrics.CACHE_LOOKUPS.values)
+
+    def test_streamed_queries_counted(self):
+        """Запросы потоковой ленты попадают в метрики её представления."""
+        labels = ('posts:index',)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse('posts:index'),
+                                       {'stream': '1'})
+            self.assertNotIn(labels, metrics.DB_QUERIES.values)
+            b''.join(response.streaming_content)
+        _, total, count = metrics.DB_QUERIES.values[labels]
+        self.assertEqual(count, 1)
+        self.assertEqual(total, len(captured))
+
+    def test_metrics_endpoint(self):
+        """/metrics отдаёт текстовый формат Prometheus."""
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        text = response.content.decode()
+        self.assertIn('# TYPE yatube_request_duration_seconds histogram', text)
+        self.assertIn(
+            'yatube_request_duration_seconds_bucket'
+            '{view="posts:index",le="+Inf"} 1', text)
+        self.assertIn('yatube_db_queries_count{view="posts:index"} 1', text)
+
+    @override_settings(METRICS_ALLOWED_IPS=[])
+    def test_metrics_hidden_from_other_addresses(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+
+    @override_settings(METRICS_ALLOWED_IPS=[], METRICS_TOKEN='s3cret')
+    def test_metrics_token(self):
+        """За прокси Prometheus проходит по токену, а не по адресу."""
+        url = reverse('metrics')
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.get(
+            url, HTTP_AUTHORIZATION='Bearer wrong').status_code, 404)
+        self.assertEqual(self.client.get(
+            url, HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = metrics.Histogram('h', 'Тест', (1, 5), ('view',))
+        for value in (0, 3, 7):
+            histogram.observe(('index',), value)
+        self.assertEqual(list(histogram.samples()), [
+            'h_bucket{view="index",le="1"} 1',
+            'h_bucket{view="index",le="5"} 2',
+            'h_bucket{view="index",le="+Inf"} 3',
+            'h_sum{view="index"} 10',
+            'h_count{view="index"} 3',
+        ])
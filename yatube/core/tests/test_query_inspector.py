@@ -0,0 +1,58 @@
+from django.contrib.auth import get_user_model
+from django.template import Context, Template
+from django.test import TestCase
+
+from posts.models import Post
+
+from ..query_inspector import (QueryBudgetExceeded, QueryRecorder,
+                               fingerprint, query_budget, wrap_connections)
+
+User = get_user_model()
+
+
+class QueryInspectorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for number in range(3):
+            Post.objects.create(
+                author=User.objects.create(username=f'Автор {number}'),
+                text='Пост',
+            )
+
+    def test_fingerprint_ignores_values(self):
+        """Запросы, отличающиеся только значениями, дают один отпечаток."""
+        self.assertEqual(
+            fingerprint('SELECT * FROM "posts_post" WHERE "id" IN (1, 2, 3)'
+                        " AND text = 'a' LIMIT 21"),
+            fingerprint('SELECT *  FROM "posts_post"\n WHERE "id" IN (%s)'
+                        ' AND text = %s LIMIT 5'),
+        )
+
+    def test_template_n_plus_one_points_to_template_line(self):
+        """Ленивая загрузка автора в цикле указывает на строку шаблона."""
+        template = Template(
+            '{% for post in posts %}\n{{ post.author.username }}\n'
+            '{% endfor %}'
+        )
+        with wrap_connections(QueryRecorder()) as recorder:
+            template.render(Context({'posts': Post.objects.all()}))
+        (count, shape, origins), = recorder.duplicates(threshold=3)
+        self.assertEqual(count, 3)
+        self.assertIn('"auth_user"', shape)
+        self.assertEqual(origins, ['<unknown source>:2'])
+
+    def test_budget_exceeded(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'бюджете 1'):
+            with query_budget(1):
+                list(Post.objects.all())
+                list(User.objects.all())
+        with self.assertRaisesMessage(QueryBudgetExceeded, '3 × SELECT'):
+            with query_budget(10, threshold=3):
+                for post in Post.objects.all():
+                    post.author.username
+
+    def test_budget_respected(self):
+        with query_budget(1) as recorder:
+            list(Post.objects.select_related('author'))
+        self.assertEqual(recorder.count, 1)
+        self.assertEqual(recorder.duplicates(), [])
@@ -0,0 +1,96 @@
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post
+from yatube.cache_config import build_caches, instrument_caches
+
+from ..backends.auth import USER_CACHE_ALIAS
+
+User = get_user_model()
+
+
+def session_queries(queries):
+    return [
+        query['sql'] for query in queries if 'django_session' in query['sql']
+    ]
+
+
+class SessionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='Читатель')
+        Post.objects.create(author=cls.user, text='Пост')
+
+    def setUp(self):
+        caches['fragments'].clear()
+        caches[USER_CACHE_ALIAS].clear()
+
+    def test_anonymous_feed_does_not_touch_sessions(self):
+        """Аноним читает ленты без сессии и без новых cookie."""
+        for url in (reverse('posts:index'),
+                    reverse('posts:profile', args=[self.user.username])):
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+                self.assertEqual(session_queries(queries), [])
+                self.assertEqual(response.cookies, {})
+
+    def test_logged_in_user_loaded_from_cache(self):
+        """С общим кэшем повторный запрос не обращается к базе за сессией
+        и auth_user."""
+        with tempfile.TemporaryDirectory() as root:
+            with override_settings(CACHES=instrument_caches(build_caches({
+                'YATUBE_CACHE_BACKEND': 'file',
+                'YATUBE_CACHE_LOCATION': root,
+            }))):
+                self.client.force_login(self.user)
+                url = reverse('about:author')
+                self.client.get(url)
+                with self.assertNumQueries(0):
+                    response = self.client.get(url)
+        self.assertEqual(response.context['user'], self.user)
+
+    def test_process_local_cache_does_not_keep_stale_user(self):
+        """Смена пароля в другом воркере разлогинивает и здесь: кэш
+        в памяти процесса пользователя не хранит."""
+        self.client.force_login(self.user)
+        self.client.get(reverse('about:author'))
+        # update() не шлёт сигналов — как сохранение в другом процессе.
+        User.objects.filter(pk=self.user.pk).update(
+            password=make_password('новый-пароль'))
+        response = self.client.get(reverse('about:author'))
+        self.assertFalse(response.context['user'].is_authenticated)
+
+    def test_password_change_logs_out(self):
+        """Сохранение пользователя сбрасывает его запись в кэше."""
+        user = User.objects.get(pk=self.user.pk)
+        self.client.force_login(user)
+        self.client.get(reverse('about:author'))
+        user.set_password('новый-пароль')
+        user.save()
+        response = self.client.get(reverse('about:author'))
+        self.assertFalse(response.context['user'].is_authenticated)
+
+    @override_settings(
+        SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_signed_cookie_sessions(self):
+        """Сессия в подписанной cookie не читает django_session."""
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(session_queries(queries), [])
+
+    def test_sessions_of_model_backend_still_valid(self):
+        """Сессии, созданные до CachedModelBackend, не разлогиниваются."""
+        self.client.force_login(
+            self.user, backend='django.contrib.auth.backends.ModelBackend')
+        response = self.client.get(reverse('about:author'))
+        self.assertEqual(response.context['user'], self.user)
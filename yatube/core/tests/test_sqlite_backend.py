@@ -0,0 +1,33 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from ..backends.sqlite3 import benchmark
+from ..backends.sqlite3.base import pragma_statements
+
+
+class SqliteBackendTests(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied_on_connect(self):
+        """PRAGMA из настроек выполняются при открытии соединения."""
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('temp_store'), 2)
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        self.assertEqual(self.pragma('cache_size'), -20000)
+
+
+class SqliteBenchmarkTests(SimpleTestCase):
+    def test_tuned_backend_does_not_lock(self):
+        """Под конкурентной записью настроенный бэкенд не теряет записи."""
+        result = benchmark.run(benchmark.BACKENDS['tuned'], workers=4,
+                               writes=20)
+        self.assertEqual(result['committed'], 80)
+        self.assertEqual(result['locked'], 0)
+
+    def test_invalid_pragma(self):
+        with self.assertRaises(ImproperlyConfigured):
+            pragma_statements({'journal_mode': 'WAL; DROP TABLE x'})
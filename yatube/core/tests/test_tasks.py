@@ -0,0 +1,135 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts import stats
+from posts import tasks as posts_tasks
+from posts.models import Comment, Follow, Post, TimelineEntry
+
+from .. import tasks
+from ..models import Task
+
+User = get_user_model()
+
+calls = []
+
+
+@tasks.task
+def flaky(value):
+    calls.append(value)
+    if len(calls) < 2:
+        raise RuntimeError('Временная ошибка')
+
+
+@override_settings(TASKS_EAGER=False)
+class TaskQueueTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='Автор')
+        cls.reader = User.objects.create(username='Читатель')
+
+    def setUp(self):
+        calls.clear()
+
+    def test_writes_enqueue_side_effects(self):
+        """Запись только ставит задачи, воркер выполняет их позже."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Пост')
+        self.assertEqual(Task.objects.count(), 2)
+        self.assertFalse(TimelineEntry.objects.exists())
+        author_stats = stats.stats_for(self.author.pk)
+        self.assertEqual(author_stats.posts_count, 1)
+        self.assertEqual(author_stats.followers_count, 1)
+
+        out = StringIO()
+        call_command('run_worker', once=True, stdout=out)
+        self.assertIn('Выполнено задач: 2', out.getvalue())
+        self.assertFalse(Task.objects.exists())
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post).exists())
+        author_stats = stats.stats_for(self.author.pk)
+        self.assertEqual(author_stats.posts_count, 1)
+        self.assertEqual(author_stats.followers_count, 1)
+
+    def test_follow_button_changes_before_worker_runs(self):
+        """Закэшированный профиль сразу показывает новую подписку."""
+        cache.clear()
+        self.client.force_login(self.reader)
+        profile = reverse('posts:profile',
+                          kwargs={'username': self.author.username})
+        self.assertContains(self.client.get(profile), 'Подписаться')
+        self.client.get(reverse('posts:profile_follow',
+                                kwargs={'username': self.author.username}))
+        self.assertTrue(Task.objects.exists())
+        self.assertContains(self.client.get(profile), 'Отписаться')
+        self.client.get(reverse('posts:profile_unfollow',
+                                kwargs={'username': self.author.username}))
+        self.assertContains(self.client.get(profile), 'Подписаться')
+
+    def test_rolled_back_write_leaves_no_task_or_counter(self):
+        """Задача и счётчик фиксируются вместе с записью."""
+        stats.recount(self.author.pk)
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                Post.objects.create(author=self.author, text='Пост')
+                raise RuntimeError('Сбой до коммита')
+        self.assertFalse(Task.objects.exists())
+        self.assertEqual(stats.stats_for(self.author.pk).posts_count, 0)
+
+    def test_retried_tasks_do_not_double_count(self):
+        """Повтор задач не меняет счётчики, посчитанные при записи."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий')
+        for _ in range(2):
+            posts_tasks.post_created(post.pk)
+            posts_tasks.comment_created(post.pk, comment.created.timestamp())
+        self.assertEqual(stats.stats_for(self.author.pk).posts_count, 1)
+        self.assertEqual(stats.stats_for(self.reader.pk).comments_count, 1)
+
+    def test_failed_task_retried_with_backoff(self):
+        """Упавшая задача повторяется позже и в итоге выполняется."""
+        tasks.enqueue(flaky, 1)
+        self.assertEqual(tasks.run_pending(), (0, 1))
+        job = Task.objects.get()
+        self.assertEqual(job.status, Task.PENDING)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('Временная ошибка', job.last_error)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertEqual(tasks.run_pending(), (0, 0))
+
+        Task.objects.update(run_at=timezone.now())
+        self.assertEqual(tasks.run_pending(), (1, 0))
+        self.assertFalse(Task.objects.exists())
+
+    def test_task_fails_after_max_attempts(self):
+        Task.objects.create(
+            name='posts.tasks.missing', attempts=tasks.TASK_MAX_ATTEMPTS - 1
+        )
+        with self.assertLogs('core.tasks', 'ERROR'):
+            tasks.run_pending()
+        self.assertEqual(Task.objects.get().status, Task.FAILED)
+        self.assertEqual(tasks.run_pending(), (0, 0))
+
+    def test_stale_running_task_reclaimed(self):
+        """Задачу упавшего воркера забирает другой воркер."""
+        tasks.enqueue(flaky, 1)
+        self.assertEqual(len(tasks.claim()), 1)
+        self.assertEqual(tasks.claim(), [])
+        Task.objects.update(locked_at=timezone.now() - timedelta(
+            seconds=tasks.TASK_LOCK_TIMEOUT + 1))
+        self.assertEqual(len(tasks.claim()), 1)
+
+    @override_settings(TASKS_EAGER=True)
+    def test_eager_mode_runs_inline(self):
+        Post.objects.create(author=self.author, text='Пост')
+        self.assertFalse(Task.objects.exists())
+        self.assertEqual(stats.stats_for(self.author.pk).posts_count, 1)
@@ -0,0 +1,54 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.template import engines
+from django.test import SimpleTestCase, override_settings
+
+from ..template_warmup import template_names, warm_up
+
+
+def cached_templates(directory):
+    return [{
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [directory],
+        'OPTIONS': {
+            'loaders': [('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+            ])],
+        },
+    }]
+
+
+class TemplateWarmUpTests(SimpleTestCase):
+    def test_project_templates_compile(self):
+        """Все шаблоны проекта и приложений компилируются без ошибок."""
+        names = template_names(engines['django'])
+        self.assertIn('posts/index.html', names)
+        self.assertIn('includes/header.html', names)
+        loaded, errors = warm_up()
+        self.assertEqual(errors, {})
+        self.assertGreaterEqual(loaded, len(names))
+
+    def test_warm_up_fills_cached_loader(self):
+        """После прогрева шаблоны лежат в кэше загрузчика."""
+        with tempfile.TemporaryDirectory() as directory:
+            os.makedirs(os.path.join(directory, 'posts'))
+            with open(os.path.join(directory, 'posts', 'ok.html'), 'w') as f:
+                f.write('{% if True %}ok{% endif %}')
+            with override_settings(TEMPLATES=cached_templates(directory)):
+                warm_up()
+                loader = engines['django'].engine.template_loaders[0]
+                self.assertIn('posts/ok.html', loader.get_template_cache)
+
+    def test_broken_template_reported(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, 'broken.html'), 'w') as f:
+                f.write('{% if %}')
+            with override_settings(TEMPLATES=cached_templates(directory)):
+                self.assertIn('broken.html', warm_up()[1])
+                with self.assertRaises(CommandError):
+                    call_command('warm_templates', stdout=StringIO(),
+                                 stderr=StringIO())
@@ -1,5 +1,11 @@
+import hmac
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
 
+from . import metrics as request_metrics
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -15,3 +21,28 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def metrics_allowed(request):
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        header = request.META.get('HTTP_AUTHORIZATION', '')
+        if hmac.compare_digest(header.encode(), f'Bearer {token}'.encode()):
+            return True
+    if request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS:
+        return True
+    return request.user.is_staff
+
+
+def metrics(request):
+    """Метрики процесса для Prometheus.
+
+    Доступны с заголовком Authorization: Bearer METRICS_TOKEN, с адресов
+    из METRICS_ALLOWED_IPS и сотрудникам. За обратным прокси на той же
+    машине REMOTE_ADDR у всех запросов 127.0.0.1, поэтому список адресов
+    там открыл бы /metrics всему интернету — используйте токен.
+    """
+    if not metrics_allowed(request):
+        raise Http404
+    return HttpResponse(
+        request_metrics.render(), content_type=request_metrics.CONTENT_TYPE)
@@ -1,5 +1,6 @@
 from django.contrib import admin
 
+from . import search
 from .models import Post, Group, Comment, Follow
 
 
@@ -10,6 +11,13 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по полнотекстовому индексу вместо LIKE '%...%' по таблице.
+        if not search_term.strip():
+            return queryset, False
+        ids = search.ranked_ids(search_term, search.SEARCH_ADMIN_LIMIT)
+        return queryset.filter(pk__in=ids), False
+
 
 admin.site.register(Post, PostAdmin)
 
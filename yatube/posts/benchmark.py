@@ -0,0 +1,221 @@
+"""Нагрузочный прогон всех маршрутов posts.urls.
+
+Используется командой ``manage.py bench`` и тестами: наполняет базу
+заданным объёмом данных и для каждого маршрута снимает число SQL-запросов,
+p50/p95 времени ответа и пик выделенной памяти. Маршруты, которые меняют
+данные даже на GET (подписка и отписка), выполняются в транзакции,
+которая откатывается после каждого запроса, поэтому все повторы видят
+одни и те же данные.
+"""
+import json
+import random
+import statistics
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import caching, stats, timeline
+from .models import Follow, Group, Post
+from .urls import app_name, urlpatterns
+
+User = get_user_model()
+
+SEED_BATCH_SIZE: int = 5000
+BENCH_USERNAME_PREFIX = 'bench_user_'
+WRITE_ROUTES = ('profile_follow', 'profile_unfollow')
+OK_STATUSES = (200, 302)
+
+
+class BenchmarkError(RuntimeError):
+    pass
+
+
+def _batched(objects, size=SEED_BATCH_SIZE):
+    objects = iter(objects)
+    while True:
+        batch = list(islice(objects, size))
+        if not batch:
+            return
+        yield batch
+
+
+def seed(users, posts, follows, groups=20, seed_value=0):
+    """Наполняет базу через bulk_create и пересобирает производные данные."""
+    rnd = random.Random(seed_value)
+    for batch in _batched(
+        User(username=f'{BENCH_USERNAME_PREFIX}{number}',
+             first_name='Bench', last_name=str(number))
+        for number in range(users)
+    ):
+        User.objects.bulk_create(batch)
+    Group.objects.bulk_create(
+        Group(title=f'Bench group {number}', slug=f'bench-{number}',
+              description='Группа для нагрузочного прогона')
+        for number in range(groups)
+    )
+    user_ids = list(User.objects.filter(
+        username__startswith=BENCH_USERNAME_PREFIX
+    ).values_list('pk', flat=True))
+    group_ids = list(Group.objects.filter(
+        slug__startswith='bench-'
+    ).values_list('pk', flat=True))
+    for batch in _batched(
+        Post(author_id=rnd.choice(user_ids),
+             group_id=rnd.choice(group_ids + [None]),
+             text=f'Bench post {number}')
+        for number in range(posts)
+    ):
+        Post.objects.bulk_create(batch)
+    pairs = set()
+    attempts = 0
+    if len(user_ids) < 2:
+        follows = 0
+    while len(pairs) < follows and attempts < follows * 3:
+        attempts += 1
+        user_id, author_id = rnd.sample(user_ids, 2)
+        pairs.add((user_id, author_id))
+    for batch in _batched(
+        Follow(user_id=user_id, author_id=author_id)
+        for user_id, author_id in pairs
+    ):
+        Follow.objects.bulk_create(batch)
+    # bulk_create не отправляет сигналы, поэтому ленты и счётчики
+    # собираются отдельно.
+    stats.rebuild()
+    timeline.rebuild()
+
+
+def route_kwargs():
+    """Аргументы reverse() для каждого маршрута на засеянных данных."""
+    user = Follow.objects.select_related('user').order_by('pk').first()
+    user = user.user if user else User.objects.order_by('pk').first()
+    post = Post.objects.filter(author=user).first() or Post.objects.first()
+    group = Group.objects.filter(post__isnull=False).first()
+    # Подписка на себя ничего не пишет, поэтому подписка и отписка
+    # замеряются на другом авторе.
+    author = User.objects.exclude(pk=getattr(user, 'pk', None)).exclude(
+        following__user=user).order_by('pk').first()
+    values = {
+        'slug': group.slug if group else 'missing',
+        'post_id': post.pk if post else 0,
+        'username': user.username if user else 'missing',
+    }
+    routes = {}
+    for pattern in urlpatterns:
+        kwargs = {name: values[name] for name in pattern.pattern.converters}
+        if pattern.name in WRITE_ROUTES and author is not None:
+            kwargs['username'] = author.username
+        routes[pattern.name] = kwargs
+    return user, routes
+
+
+def clear_caches():
+    for alias in ('default', caching.FRAGMENT_CACHE_ALIAS):
+        caches[alias].clear()
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+@contextmanager
+def _rolled_back():
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def _get(client, name, url):
+    """GET маршрута; данные, изменённые запросом, откатываются."""
+    with _rolled_back() if name in WRITE_ROUTES else nullcontext():
+        response = client.get(url)
+    if response.status_code not in OK_STATUSES:
+        raise BenchmarkError(
+            f'{name}: {url} ответил {response.status_code}')
+    return response
+
+
+def measure(repeat=20, cold=False):
+    """Снимает метрики для каждого маршрута posts.urls.
+
+    Ответ не 200 и не 302 — ошибка прогона: замер пустой страницы или 404
+    ничего не говорит о настоящей нагрузке.
+    """
+    user, routes = route_kwargs()
+    client = Client()
+    if user is not None:
+        client.force_login(user)
+    results = {}
+    for name, kwargs in routes.items():
+        url = reverse(f'{app_name}:{name}', kwargs=kwargs)
+        timings = []
+        queries = 0
+        for _ in range(repeat):
+            if cold:
+                clear_caches()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                _get(client, name, url)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries = max(queries, len(captured))
+        if cold:
+            clear_caches()
+        tracemalloc.start()
+        _get(client, name, url)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[name] = {
+            'url': url,
+            'queries': queries,
+            'p50_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'peak_kb': round(peak / 1024, 1),
+        }
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Возвращает описания регрессий относительно baseline.
+
+    Число запросов детерминировано и сравнивается строго, время и память
+    допускают рост не более чем в ``threshold`` раз.
+    """
+    regressions = []
+    for name, current in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        if current['queries'] > expected['queries']:
+            regressions.append(
+                f'{name}: запросов {current["queries"]}, '
+                f'было {expected["queries"]}'
+            )
+        for metric in ('p95_ms', 'peak_kb'):
+            limit = expected[metric] * threshold
+            if current[metric] > limit:
+                regressions.append(
+                    f'{name}: {metric} {current[metric]}, '
+                    f'допустимо {round(limit, 3)}'
+                )
+    return regressions
+
+
+def load_baseline(path):
+    with open(path, encoding='utf-8') as baseline_file:
+        return json.load(baseline_file)
+
+
+def save_baseline(path, results):
+    with open(path, 'w', encoding='utf-8') as baseline_file:
+        json.dump(results, baseline_file, ensure_ascii=False, indent=2,
+                  sort_keys=True)
@@ -0,0 +1,270 @@
+"""Версионирование кэша ленты и кэш страниц целиком.
+
+Вместо удаления ключей при каждом изменении увеличивается счётчик
+поколения. Старые фрагменты просто перестают читаться и вытесняются
+по TTL, поэтому TTL можно держать большим без риска показать устаревшую
+ленту.
+
+Поколения разделены по тому, что изменилось:
+
+* лента — посты появились или удалены, меняется состав лент по дате;
+* популярность — изменился счёт популярности;
+* пост — правка, комментарий, готовая миниатюра;
+* автор — число его постов и состав профиля;
+* группа — правка группы и состав её ленты;
+* сайт — массовые изменения (импорт, пересборки).
+
+Страница запоминает значения поколений, от которых она зависит
+(depend_on(), depend_on_posts()), и при чтении из кэша сверяет их одним
+get_many. Комментарий меняет только поколение своего поста, поэтому
+сбрасываются его страница и страницы лент, на которых этот пост виден.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.utils.cache import patch_vary_headers
+
+from core import db_router
+
+SITE_GENERATION_KEY = 'posts:site_generation'
+FEED_GENERATION_KEY = 'posts:feed_generation'
+TRENDING_GENERATION_KEY = 'posts:trending_generation'
+POST_GENERATION_KEY = 'posts:post_generation:{post_id}'
+AUTHOR_GENERATION_KEY = 'posts:author_generation:{author_id}'
+GROUP_GENERATION_KEY = 'posts:group_generation:{group_id}'
+TIMELINE_GENERATION_KEY = 'posts:timeline_generation:{user_id}'
+PAGE_CACHE_KEY = 'posts:page:{digest}'
+FRAGMENT_CACHE_KEY = 'posts:fragment:{name}:{digest}'
+# Имена и прочие поля пользователей не версионируются, поэтому страницы
+# и фрагменты с ними живут недолго.
+PAGE_CACHE_TIMEOUT: int = 60 * 10
+# Фрагменты и страницы живут в отдельном кэше со своей политикой
+# вытеснения; счётчики поколений остаются в default.
+FRAGMENT_CACHE_ALIAS = 'fragments'
+
+
+def _initial_generation():
+    # Если счётчик вытеснен, новое значение не совпадёт ни с одним
+    # из ранее выданных поколений.
+    return int(time.time() * 1000)
+
+
+def generation(key):
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, _initial_generation(), None)
+        value = cache.get(key)
+    return value
+
+
+def generations(keys):
+    """Текущие значения нескольких поколений одним обращением к кэшу."""
+    keys = list(keys)
+    values = cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        for key in missing:
+            cache.add(key, _initial_generation(), None)
+        values.update(cache.get_many(missing))
+    return values
+
+
+def _incr(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _initial_generation(), None)
+
+
+def bump(key):
+    """Сдвигает поколение сразу и, внутри транзакции, ещё раз после
+    коммита: страница, собранная до коммита по старым данным, иначе
+    сохранилась бы с уже новым поколением."""
+    _incr(key)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _incr(key))
+
+
+def post_key(post_id):
+    return POST_GENERATION_KEY.format(post_id=post_id)
+
+
+def author_key(author_id):
+    return AUTHOR_GENERATION_KEY.format(author_id=author_id)
+
+
+def group_key(group_id):
+    return GROUP_GENERATION_KEY.format(group_id=group_id)
+
+
+def timeline_key(user_id):
+    return TIMELINE_GENERATION_KEY.format(user_id=user_id)
+
+
+def bump_feed_generation():
+    bump(FEED_GENERATION_KEY)
+
+
+def bump_trending_generation():
+    bump(TRENDING_GENERATION_KEY)
+
+
+def bump_post_generation(post_id):
+    bump(post_key(post_id))
+
+
+def bump_author_generation(author_id):
+    bump(author_key(author_id))
+
+
+def bump_group_generation(group_id):
+    if group_id is not None:
+        bump(group_key(group_id))
+
+
+def bump_site_generation():
+    """Сбрасывает все страницы: после импорта и пересборок."""
+    bump(SITE_GENERATION_KEY)
+
+
+def timeline_generation(user_id):
+    """Меняется, когда пользователь подписывается или отписывается."""
+    return generation(timeline_key(user_id))
+
+
+def bump_timeline_generation(user_id):
+    bump(timeline_key(user_id))
+
+
+def is_anonymous(request):
+    """Без cookie сессии посетитель заведомо аноним: ни сессия,
+    ни пользователь для этого не загружаются."""
+    if settings.SESSION_COOKIE_NAME not in request.COOKIES:
+        return True
+    return not request.user.is_authenticated
+
+
+def post_keys(posts):
+    """Поколения постов и их групп: группа видна в карточке поста."""
+    keys = set()
+    for post in posts:
+        keys.add(post_key(post.pk))
+        if post.group_id is not None:
+            keys.add(group_key(post.group_id))
+    return keys
+
+
+def depend_on(request, *keys):
+    """Запоминает поколения, от которых зависит кэшируемая страница.
+
+    Значения читаются сразу, до рендера: запись, случившаяся во время
+    рендера, сдвинет поколение, и страница не будет прочитана из кэша.
+    Уже запомненные значения не перечитываются. Вне cache_page_by_state
+    ничего не делает.
+    """
+    stamps = getattr(request, 'cache_stamps', None)
+    if stamps is not None:
+        stamps.update(generations(
+            key for key in keys if key not in stamps))
+
+
+def depend_on_posts(request, posts):
+    depend_on(request, *post_keys(posts))
+
+
+def generations_digest(keys):
+    """Короткая строка из значений поколений — для ключей фрагментов."""
+    values = generations(keys)
+    parts = [f'{key}={values[key]}' for key in sorted(values)]
+    return hashlib.md5(':'.join(parts).encode()).hexdigest()
+
+
+def stamps_valid(stamps):
+    return generations(stamps) == stamps
+
+
+def fragment_key(name, *parts):
+    digest = hashlib.md5(':'.join(map(str, parts)).encode()).hexdigest()
+    return FRAGMENT_CACHE_KEY.format(name=name, digest=digest)
+
+
+def cached_fragment(key):
+    """Фрагмент из кэша, если не изменилось ничего, от чего он зависит."""
+    entry = caches[FRAGMENT_CACHE_ALIAS].get(key)
+    if entry is not None and stamps_valid(entry[1]):
+        return entry[0]
+    return None
+
+
+def fragment_timeout(timeout):
+    """Фрагмент, собранный по данным реплики, мог не увидеть последнюю
+    запись, поэтому хранится не дольше окна read-your-writes."""
+    if db_router.used_replica():
+        return min(timeout, getattr(
+            settings, 'REPLICA_PIN_SECONDS', db_router.REPLICA_PIN_SECONDS))
+    return timeout
+
+
+def store_fragment(key, value, stamps, timeout):
+    caches[FRAGMENT_CACHE_ALIAS].set(
+        key, (value, stamps), fragment_timeout(timeout))
+
+
+def page_cache_key(request):
+    """Ключ страницы: адрес и состояние посетителя.
+
+    Анонимы делят одну копию страницы. Для пользователя в ключ входят его
+    id, поколение его подписок (кнопка «Подписаться») и CSRF-cookie,
+    чтобы токен в формах страницы оставался действительным. Поколения
+    данных страницы хранятся вместе с ней, см. cache_page_by_state.
+    """
+    parts = [request.get_full_path()]
+    if is_anonymous(request):
+        parts.append('anonymous')
+    else:
+        user = request.user
+        parts += [
+            user.pk,
+            timeline_generation(user.pk),
+            request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+        ]
+    digest = hashlib.md5(':'.join(map(str, parts)).encode()).hexdigest()
+    return PAGE_CACHE_KEY.format(digest=digest)
+
+
+def _cacheable(request, response):
+    if response.status_code != 200 or response.streaming or response.cookies:
+        return False
+    if request.META.get('CSRF_COOKIE_USED'):
+        # Токен в форме привязан к cookie конкретного посетителя.
+        return (not is_anonymous(request)
+                and settings.CSRF_COOKIE_NAME in request.COOKIES)
+    return True
+
+
+def cache_page_by_state(view):
+    """Отдаёт GET-ответ представления из кэша, пока не изменились данные.
+
+    Представление отмечает, от чего зависит страница, через depend_on();
+    поколение сайта добавляется всегда.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view(request, *args, **kwargs)
+        key = page_cache_key(request)
+        response = cached_fragment(key)
+        if response is None:
+            request.cache_stamps = {}
+            depend_on(request, SITE_GENERATION_KEY)
+            response = view(request, *args, **kwargs)
+            if _cacheable(request, response):
+                store_fragment(key, response, request.cache_stamps,
+                               PAGE_CACHE_TIMEOUT)
+        patch_vary_headers(response, ('Cookie',))
+        return response
+    return wrapper
@@ -0,0 +1,108 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from posts import benchmark
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет число запросов, p50/p95 и память для всех маршрутов '
+        'posts.urls на отдельной тестовой базе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--posts', type=int, default=5000)
+        parser.add_argument('--follows', type=int, default=2000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument(
+            '--cold',
+            action='store_true',
+            help='Очищать кэш перед каждым запросом.',
+        )
+        parser.add_argument(
+            '--keepdb',
+            action='store_true',
+            help=('Не пересоздавать файловую тестовую базу и не засеивать '
+                  'её заново, если в ней уже есть посты.'),
+        )
+        parser.add_argument(
+            '--baseline',
+            help='JSON-файл с эталонными результатами.',
+        )
+        parser.add_argument(
+            '--save-baseline',
+            action='store_true',
+            help='Записать текущие результаты в --baseline.',
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=1.5,
+            help='Допустимый рост p95 и памяти относительно baseline.',
+        )
+
+    def handle(self, *args, **options):
+        if options['save_baseline'] and not options['baseline']:
+            raise CommandError('--save-baseline требует --baseline')
+        test_name = connection.settings_dict['TEST'].get('NAME')
+        if options['keepdb'] and (
+                not test_name
+                or connection.creation.is_in_memory_db(test_name)):
+            raise CommandError(
+                '--keepdb требует файловую тестовую базу: '
+                'задайте DATABASES["default"]["TEST"]["NAME"]'
+            )
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options['keepdb']
+        )
+        try:
+            if not options['keepdb'] or not Post.objects.exists():
+                benchmark.seed(
+                    users=options['users'],
+                    posts=options['posts'],
+                    follows=options['follows'],
+                    groups=options['groups'],
+                )
+            results = benchmark.measure(
+                repeat=options['repeat'], cold=options['cold']
+            )
+        except benchmark.BenchmarkError as error:
+            raise CommandError(error)
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options['keepdb']
+            )
+        self.report(results)
+        if not options['baseline']:
+            return
+        if options['save_baseline']:
+            benchmark.save_baseline(options['baseline'], results)
+            self.stdout.write(self.style.SUCCESS(
+                f'Baseline сохранён в {options["baseline"]}'
+            ))
+            return
+        regressions = benchmark.compare(
+            results,
+            benchmark.load_baseline(options['baseline']),
+            options['threshold'],
+        )
+        if regressions:
+            for regression in regressions:
+                self.stderr.write(regression)
+            raise CommandError(f'Регрессий: {len(regressions)}')
+        self.stdout.write(self.style.SUCCESS('Регрессий нет'))
+
+    def report(self, results):
+        self.stdout.write(
+            f'{"route":<20}{"queries":>8}{"p50 ms":>10}'
+            f'{"p95 ms":>10}{"peak KB":>10}'
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<20}{result["queries"]:>8}{result["p50_ms"]:>10}'
+                f'{result["p95_ms"]:>10}{result["peak_kb"]:>10}'
+            )
@@ -0,0 +1,101 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from posts import timeline
+from posts.models import Comment, Group, Post
+from posts.views import LIMIT_COMMENTS_ON_THE_PAGE, LIMIT_POSTS_ON_THE_PAGE
+
+User = get_user_model()
+
+# Признаки плана, при которых лента читается без индекса:
+# полный просмотр таблицы или сортировка отобранных строк.
+BAD_PLAN_PATTERNS = {
+    'sqlite': [
+        r'SCAN (TABLE )?posts_(post|comment|timelineentry)\b(?! USING)',
+        r'USE TEMP B-TREE FOR ORDER BY',
+    ],
+    'postgresql': [
+        r'Seq Scan on posts_(post|comment|timelineentry)\b',
+        r'\bSort\b',
+    ],
+    'mysql': [
+        r'Using filesort',
+        r"'type': 'ALL'",
+    ],
+}
+
+
+def feed_queries():
+    """Запросы лент в том виде, в каком их выполняют представления."""
+    limit = LIMIT_POSTS_ON_THE_PAGE + 1
+    ordering = ('-pub_date', '-pk')
+    user = User.objects.order_by('pk').first() or User(pk=0)
+    group = Group.objects.order_by('pk').first() or Group(pk=0)
+    post = Post.objects.order_by('pk').first() or Post(pk=0)
+    follow = timeline.follow_feed(user).order_by(*ordering)
+    # Смешанная лента подписок — несколько запросов, проверяется каждый.
+    follow_parts = {
+        f'follow_index_part_{number}': queryset[:limit]
+        for number, (queryset, _) in enumerate(
+            getattr(follow, 'parts', ()), 1)
+    } or {'follow_index': follow[:limit]}
+    return {
+        'index': Post.objects.feed().order_by(*ordering)[:limit],
+        'popular': Post.objects.feed().order_by(
+            '-trending_score', '-pk')[:limit],
+        'group_list': Post.objects.feed().filter(
+            group=group).order_by(*ordering)[:limit],
+        'profile': Post.objects.feed().filter(
+            author=user).order_by(*ordering)[:limit],
+        **follow_parts,
+        'post_detail_comments': Comment.objects.filter(
+            post=post).select_related('author').order_by(
+            'created', 'pk')[:LIMIT_COMMENTS_ON_THE_PAGE + 1],
+    }
+
+
+def bad_plan_lines(plan, vendor):
+    patterns = BAD_PLAN_PATTERNS.get(vendor, [])
+    return [
+        line for line in plan.splitlines()
+        if any(re.search(pattern, line) for pattern in patterns)
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверяет через EXPLAIN, что запросы лент читают данные '
+        'по индексу на текущем бэкенде базы данных.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verbose-plans',
+            action='store_true',
+            help='Печатать полный план каждого запроса.',
+        )
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        if vendor not in BAD_PLAN_PATTERNS:
+            raise CommandError(f'Бэкенд {vendor} не поддерживается')
+        failed = []
+        for name, queryset in feed_queries().items():
+            plan = queryset.explain()
+            problems = bad_plan_lines(plan, vendor)
+            if options['verbose_plans']:
+                self.stdout.write(f'--- {name}\n{plan}')
+            if problems:
+                failed.append(name)
+                for line in problems:
+                    self.stderr.write(f'{name}: {line.strip()}')
+            else:
+                self.stdout.write(f'{name}: OK')
+        if failed:
+            raise CommandError(
+                'Запросы без индекса: ' + ', '.join(failed)
+            )
+        self.stdout.write(self.style.SUCCESS('Все ленты читаются по индексу'))
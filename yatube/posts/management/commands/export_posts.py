@@ -0,0 +1,40 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково выгружает группы, посты, комментарии или подписки '
+        'в JSONL/CSV.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', required=True,
+                            choices=list(transfer.KINDS))
+        parser.add_argument('--format', choices=transfer.FORMATS,
+                            default='jsonl')
+        parser.add_argument('--output', default='-',
+                            help='Файл для записи или - для stdout.')
+        parser.add_argument('--chunk-size', type=int,
+                            default=transfer.IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if options['output'] == '-':
+            written = self.export(sys.stdout, options)
+        else:
+            with open(options['output'], 'w', encoding='utf-8',
+                      newline='') as stream:
+                written = self.export(stream, options)
+        self.stderr.write(self.style.SUCCESS(f'Выгружено: {written}'))
+
+    def export(self, stream, options):
+        return transfer.export_records(
+            options['kind'], stream, options['format'],
+            chunk_size=options['chunk_size'], progress=self.progress,
+        )
+
+    def progress(self, kind, count):
+        self.stderr.write(f'{kind}: {count}')
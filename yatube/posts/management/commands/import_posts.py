@@ -0,0 +1,64 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково импортирует группы, посты, комментарии или подписки '
+        'из JSONL/CSV пачками bulk_create.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл с записями или - для stdin.')
+        parser.add_argument('--kind', required=True,
+                            choices=list(transfer.KINDS))
+        parser.add_argument('--format', choices=transfer.FORMATS,
+                            help='По умолчанию — по расширению файла.')
+        parser.add_argument('--batch-size', type=int,
+                            default=transfer.IMPORT_BATCH_SIZE)
+        parser.add_argument(
+            '--create-users',
+            action='store_true',
+            help='Создавать пользователей, которых нет в базе.',
+        )
+        parser.add_argument(
+            '--skip-rebuild',
+            action='store_true',
+            help='Не пересобирать счётчики и ленты после импорта.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('csv' if path.endswith('.csv')
+                                    else 'jsonl')
+        importer = transfer.Importer(
+            batch_size=options['batch_size'],
+            create_users=options['create_users'],
+            progress=self.progress,
+        )
+        try:
+            if path == '-':
+                imported = importer.run(
+                    options['kind'], transfer.read_records(sys.stdin, fmt)
+                )
+            else:
+                with open(path, encoding='utf-8', newline='') as stream:
+                    imported = importer.run(
+                        options['kind'], transfer.read_records(stream, fmt)
+                    )
+        except (OSError, ValueError) as error:
+            raise CommandError(f'Импорт прерван: {error!r}')
+        for number, reason in importer.rejected:
+            self.stderr.write(f'Запись {number} пропущена: {reason}')
+        if not options['skip_rebuild']:
+            self.stdout.write('Пересборка счётчиков и лент...')
+            transfer.rebuild_derived(options['kind'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Импортировано: {imported}, пропущено: {importer.skipped}'
+        ))
+
+    def progress(self, kind, count):
+        self.stdout.write(f'{kind}: {count}')
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import stats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает или проверяет счётчики AuthorStats.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Только сравнить счётчики с данными, ничего не меняя.',
+        )
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            found = 0
+            for user_id, counter, actual, expected in stats.mismatches():
+                found += 1
+                self.stdout.write(
+                    f'user={user_id} {counter}: '
+                    f'сохранено {actual}, ожидается {expected}'
+                )
+            if found:
+                raise CommandError(f'Найдено расхождений: {found}')
+            self.stdout.write(self.style.SUCCESS('Счётчики корректны'))
+            return
+        rebuilt = stats.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано авторов: {rebuilt}'
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = ('Восстанавливает полнотекстовый индекс постов '
+            'и заново индексирует все тексты.')
+
+    def handle(self, *args, **options):
+        search.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Поисковый индекс пересобран ({connection.vendor})'
+        ))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts import caching, trending
+from posts.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает счета популярности всех постов по датам '
+            'публикаций и комментариев.')
+
+    def handle(self, *args, **options):
+        count = trending.rebuild(Post, Comment)
+        caching.bump_trending_generation()
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитана популярность {count} постов'
+        ))
@@ -0,0 +1,30 @@
+# Generated by Django 2.2.16 on 2026-10-17 04:46
+
+from django.db import migrations, models
+import posts.trending
+
+
+def rebuild_scores(apps, schema_editor):
+    from posts import trending
+    trending.rebuild(apps.get_model('posts', 'Post'),
+                     apps.get_model('posts', 'Comment'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_comment_cursor_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='trending_score',
+            field=models.FloatField(default=posts.trending.initial_score, editable=False, help_text='Логарифм затухающей суммы реакций, см. posts/trending.py', verbose_name='Популярность'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-trending_score', '-id'], name='post_trending_idx'),
+        ),
+        migrations.RunPython(rebuild_scores, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,18 @@
+import json
+
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from . import trending
 
 User = get_user_model()
 REDUCTION_TEXT = 15
+IMAGE_VARIANT_TYPES = (
+    ('avif', 'image/avif'),
+    ('webp', 'image/webp'),
+)
 
 
 class Group(models.Model):
@@ -18,6 +28,38 @@ class Group(models.Model):
         return self.title
 
 
+def comments_count(post_ref='pk'):
+    """Число комментариев поста коррелированным подзапросом."""
+    total = Comment.objects.filter(
+        post=OuterRef(post_ref)
+    ).order_by().values('post').annotate(
+        total=Count('pk')
+    ).values('total')
+    return Coalesce(Subquery(total, output_field=IntegerField()), 0)
+
+
+class PostQuerySet(models.QuerySet):
+    FEED_FIELDS = (
+        'text',
+        'pub_date',
+        'image',
+        'thumbnail',
+        'image_variants',
+        'author__username',
+        'author__first_name',
+        'author__last_name',
+        'group__title',
+        'group__slug',
+        'trending_score',
+    )
+
+    def feed(self):
+        """Посты для лент: всё, что рисует post_list.html, одним запросом."""
+        return self.select_related('author', 'group').only(
+            *self.FEED_FIELDS
+        ).annotate(comments_count=comments_count())
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name='Текст поста',
@@ -48,15 +90,60 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    thumbnail = models.CharField(
+        max_length=255,
+        blank=True,
+        editable=False,
+        verbose_name='Миниатюра',
+    )
+    image_variants = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name='Варианты картинки',
+        help_text='srcset по форматам в JSON',
+    )
+    trending_score = models.FloatField(
+        default=trending.initial_score,
+        editable=False,
+        verbose_name='Популярность',
+        help_text='Логарифм затухающей суммы реакций, см. posts/trending.py',
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='post_pub_date_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_pub_date_idx'),
+            models.Index(fields=['-trending_score', '-id'],
+                         name='post_trending_idx'),
+        ]
 
     def __str__(self):
         return f'{str(self.text)[:REDUCTION_TEXT]}'
 
+    @property
+    def image_sources(self):
+        """Источники для <picture>: от более компактных форматов."""
+        try:
+            variants = json.loads(self.image_variants)
+        except ValueError:
+            return []
+        if not isinstance(variants, dict):
+            return []
+        return [
+            {'type': mime_type, 'srcset': variants[extension]}
+            for extension, mime_type in IMAGE_VARIANT_TYPES
+            if extension in variants
+        ]
+
 
 class Comment(models.Model):
     text = models.TextField(
@@ -86,6 +173,11 @@ class Comment(models.Model):
     class Meta:
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            # id замыкает ключ курсорной пагинации комментариев.
+            models.Index(fields=['post', 'created', 'id'],
+                         name='comment_post_created_id_idx'),
+        ]
 
     def __str__(self):
         return f'{str(self.text)[:REDUCTION_TEXT]}'
@@ -104,3 +196,73 @@ class Follow(models.Model):
             models.UniqueConstraint(fields=['user', 'author'],
                                     name='unique following')
         ]
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор поста',
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        ordering = ['-pub_date', '-id']
+        verbose_name = 'Запись ленты подписок'
+        verbose_name_plural = 'Записи ленты подписок'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='unique timeline entry')
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-id'],
+                         name='timeline_user_feed_idx'),
+            models.Index(fields=['user', 'author'],
+                         name='timeline_user_author_idx'),
+        ]
+
+
+class AuthorStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь',
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Постов',
+    )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Комментариев',
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Подписчиков',
+    )
+    following_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Подписок',
+    )
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+    def __str__(self):
+        return f'{self.user}'
@@ -0,0 +1,181 @@
+import base64
+import binascii
+import json
+from collections.abc import Sequence
+from datetime import datetime
+
+from django.db.models import DateTimeField, Q
+from django.utils.dateparse import parse_datetime
+
+CURSOR_PARAM = 'cursor'
+
+
+def encode_cursor(value, pk, reverse=False):
+    """Упаковывает позицию в ленте в непрозрачный токен.
+
+    value — дата или число (например, счёт популярности).
+    """
+    if isinstance(value, datetime):
+        payload = {'d': value.isoformat(), 'i': pk}
+    else:
+        payload = {'v': value, 'i': pk}
+    if reverse:
+        payload['r'] = 1
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Возвращает (value, pk, reverse) или None для битого токена."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        payload = json.loads(raw.decode())
+        if 'v' in payload:
+            value = float(payload['v'])
+        else:
+            value = parse_datetime(payload['d'])
+        pk = int(payload['i'])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        return None
+    if value is None:
+        return None
+    return value, pk, bool(payload.get('r'))
+
+
+class CursorPage(Sequence):
+    """Страница ленты без COUNT(*) и OFFSET.
+
+    Повторяет ту часть интерфейса django.core.paginator.Page,
+    которой пользуются шаблоны ленты.
+    """
+
+    is_cursor = True
+
+    def __init__(self, object_list, has_next, has_previous,
+                 next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<CursorPage: %s objects>' % len(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+
+class CursorPaginator:
+    """Keyset-пагинация по паре (date_field, id).
+
+    По умолчанию лента идёт от новых записей к старым; newest_first=False
+    разворачивает порядок (например, для комментариев). Вместо даты
+    подходит и числовое поле: лента «Популярное» листается
+    по trending_score.
+    """
+
+    def __init__(self, object_list, per_page, date_field='pub_date',
+                 newest_first=True):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.date_field = date_field
+        self.newest_first = newest_first
+
+    def _ordered(self, forward):
+        date_field = self.date_field
+        if forward == self.newest_first:
+            return self.object_list.order_by(f'-{date_field}', '-pk')
+        return self.object_list.order_by(date_field, 'pk')
+
+    def _after(self, queryset, date, pk, forward):
+        lookup = 'lt' if forward == self.newest_first else 'gt'
+        date_field = self.date_field
+        return queryset.filter(
+            Q(**{f'{date_field}__{lookup}': date})
+            | Q(**{date_field: date, f'pk__{lookup}': pk})
+        )
+
+    def _decode(self, token):
+        position = decode_cursor(token)
+        if position is None:
+            return None
+        field = self.object_list.model._meta.get_field(self.date_field)
+        # Курсор ленты с другим ключом считается битым.
+        if isinstance(position[0], datetime) != isinstance(
+                field, DateTimeField):
+            return None
+        return position
+
+    def get_page(self, token):
+        position = self._decode(token)
+        if position is None:
+            return self._forward(None)
+        date, pk, reverse = position
+        if reverse:
+            return self._backward(date, pk)
+        return self._forward((date, pk))
+
+    def queryset_after(self, token):
+        """Все записи после курсора в порядке ленты, без ограничения."""
+        queryset = self._ordered(forward=True)
+        position = self._decode(token)
+        if position is not None and not position[2]:
+            date, pk, _ = position
+            queryset = self._after(queryset, date, pk, forward=True)
+        return queryset
+
+    def _forward(self, after):
+        queryset = self._ordered(forward=True)
+        if after is not None:
+            date, pk = after
+            queryset = self._after(queryset, date, pk, forward=True)
+        rows = list(queryset[:self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        return self._make_page(rows, has_next, after is not None)
+
+    def _backward(self, date, pk):
+        queryset = self._after(
+            self._ordered(forward=False), date, pk, forward=False
+        )
+        rows = list(queryset[:self.per_page + 1])
+        if not rows:
+            return self._forward(None)
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        rows.reverse()
+        return self._make_page(rows, True, has_previous)
+
+    def _make_page(self, rows, has_next, has_previous):
+        next_cursor = previous_cursor = None
+        date_field = self.date_field
+        if rows and has_next:
+            last = rows[-1]
+            next_cursor = encode_cursor(getattr(last, date_field), last.pk)
+        if rows and has_previous:
+            first = rows[0]
+            previous_cursor = encode_cursor(
+                getattr(first, date_field), first.pk, reverse=True
+            )
+        return CursorPage(
+            rows,
+            has_next=bool(next_cursor),
+            has_previous=bool(previous_cursor),
+            next_cursor=next_cursor,
+            previous_cursor=previous_cursor,
+        )
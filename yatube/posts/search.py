@@ -0,0 +1,214 @@
+"""Полнотекстовый поиск по Post.text.
+
+На SQLite текст индексируется виртуальной таблицей FTS5 с внешним
+содержимым, которую синхронизируют триггеры на posts_post; на PostgreSQL —
+GIN-индексом по to_tsvector; на MySQL — индексом FULLTEXT. На остальных
+бэкендах поиск откатывается на icontains.
+
+SQLite пересоздаёт таблицу при многих изменениях схемы и теряет при этом
+триггеры, поэтому install() идемпотентна и вызывается после каждого
+migrate (см. PostsConfig.ready) и командой rebuild_search_index.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+
+from .models import Post
+
+SEARCH_RESULTS_ON_THE_PAGE: int = 10
+SEARCH_MAX_PAGES: int = 50
+SEARCH_ADMIN_LIMIT: int = 1000
+SEARCH_CONFIG = 'russian'
+
+FTS_TABLE = 'posts_post_fts'
+FULLTEXT_INDEX = 'posts_post_text_fts'
+
+SQLITE_INSTALL = (
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        text, content='posts_post', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai
+        AFTER INSERT ON posts_post BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad
+        AFTER DELETE ON posts_post BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)
+            VALUES ('delete', old.id, old.text);
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+        AFTER UPDATE OF text ON posts_post BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text)
+            VALUES ('delete', old.id, old.text);
+            INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text);
+        END""",
+)
+SQLITE_UNINSTALL = (
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+)
+
+
+def search_config():
+    config = getattr(settings, 'POSTS_SEARCH_CONFIG', SEARCH_CONFIG)
+    if not re.fullmatch(r'\w+', config):
+        raise ValueError(f'Недопустимая конфигурация поиска: {config}')
+    return config
+
+
+def _tsvector():
+    return f"to_tsvector('{search_config()}', text)"
+
+
+def _mysql_index_exists(cursor):
+    cursor.execute(
+        'SELECT COUNT(*) FROM information_schema.statistics '
+        'WHERE table_schema = DATABASE() AND table_name = %s '
+        'AND index_name = %s',
+        ['posts_post', FULLTEXT_INDEX],
+    )
+    return cursor.fetchone()[0] > 0
+
+
+def install(conn=connection):
+    """Создаёт полнотекстовый индекс, если его ещё нет."""
+    with conn.cursor() as cursor:
+        if conn.vendor == 'sqlite':
+            for sql in SQLITE_INSTALL:
+                cursor.execute(sql)
+        elif conn.vendor == 'postgresql':
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {FULLTEXT_INDEX} '
+                f'ON posts_post USING GIN ({_tsvector()})'
+            )
+        elif conn.vendor == 'mysql' and not _mysql_index_exists(cursor):
+            cursor.execute(
+                f'ALTER TABLE posts_post ADD FULLTEXT INDEX '
+                f'{FULLTEXT_INDEX} (text)'
+            )
+
+
+def uninstall(conn=connection):
+    with conn.cursor() as cursor:
+        if conn.vendor == 'sqlite':
+            for sql in SQLITE_UNINSTALL:
+                cursor.execute(sql)
+        elif conn.vendor == 'postgresql':
+            cursor.execute(f'DROP INDEX IF EXISTS {FULLTEXT_INDEX}')
+        elif conn.vendor == 'mysql' and _mysql_index_exists(cursor):
+            cursor.execute(
+                f'ALTER TABLE posts_post DROP INDEX {FULLTEXT_INDEX}'
+            )
+
+
+def rebuild(conn=connection):
+    """Переустанавливает индекс и заново индексирует все посты."""
+    install(conn)
+    with conn.cursor() as cursor:
+        if conn.vendor == 'sqlite':
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+            )
+        elif conn.vendor == 'postgresql':
+            cursor.execute(f'REINDEX INDEX {FULLTEXT_INDEX}')
+        elif conn.vendor == 'mysql':
+            cursor.execute('OPTIMIZE TABLE posts_post')
+
+
+def fts_query(query):
+    """Запрос FTS5 из слов пользователя: все слова, каждое как префикс."""
+    words = re.findall(r'\w+', query)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def ranked_ids(query, limit, offset=0):
+    """id постов по убыванию релевантности."""
+    vendor = connection.vendor
+    if vendor == 'sqlite':
+        match = fts_query(query)
+        if not match:
+            return []
+        sql = (
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'ORDER BY bm25({FTS_TABLE}), rowid DESC LIMIT %s OFFSET %s'
+        )
+        params = [match, limit, offset]
+    elif vendor == 'postgresql':
+        config = search_config()
+        tsquery = f"plainto_tsquery('{config}', %s)"
+        sql = (
+            f'SELECT id FROM posts_post WHERE {_tsvector()} @@ {tsquery} '
+            f'ORDER BY ts_rank({_tsvector()}, {tsquery}) DESC, id DESC '
+            f'LIMIT %s OFFSET %s'
+        )
+        params = [query, query, limit, offset]
+    elif vendor == 'mysql':
+        match = 'MATCH(text) AGAINST (%s IN NATURAL LANGUAGE MODE)'
+        sql = (
+            f'SELECT id FROM posts_post WHERE {match} '
+            f'ORDER BY {match} DESC, id DESC LIMIT %s OFFSET %s'
+        )
+        params = [query, query, limit, offset]
+    else:
+        return list(
+            Post.objects.filter(text__icontains=query).values_list(
+                'pk', flat=True)[offset:offset + limit]
+        )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+class SearchPage:
+    """Страница ранжированной выдачи без подсчёта общего числа совпадений."""
+
+    def __init__(self, object_list, number, has_next):
+        self.object_list = object_list
+        self.number = number
+        self._has_next = has_next
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self.number > 1
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+
+def search_page(query, page_number=None, per_page=SEARCH_RESULTS_ON_THE_PAGE):
+    try:
+        number = int(page_number or 1)
+    except ValueError:
+        number = 1
+    number = max(1, min(number, SEARCH_MAX_PAGES))
+    query = query.strip()
+    if not query:
+        return SearchPage([], number, False)
+    ids = ranked_ids(query, per_page + 1, (number - 1) * per_page)
+    has_next = len(ids) > per_page and number < SEARCH_MAX_PAGES
+    ids = ids[:per_page]
+    posts = Post.objects.feed().in_bulk(ids)
+    return SearchPage(
+        [posts[pk] for pk in ids if pk in posts], number, has_next
+    )
@@ -0,0 +1,78 @@
+"""Побочные эффекты записи.
+
+Поколения кэша и счётчики AuthorStats меняются сразу: это один incr
+и один UPDATE ... SET x = x + 1, а автор изменения не должен видеть
+устаревшую страницу. Остальное (ленты подписчиков, счёт популярности)
+уходит в очередь задач, см. posts/tasks.py.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.tasks import enqueue
+
+from . import caching, stats, tasks
+from .models import Comment, Follow, Group, Post
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    caching.bump_post_generation(instance.pk)
+    # При переносе поста старая группа сбросится по поколению поста.
+    caching.bump_group_generation(instance.group_id)
+    if created:
+        caching.bump_feed_generation()
+        caching.bump_author_generation(instance.author_id)
+        stats.increment(instance.author_id, 'posts_count')
+        enqueue(tasks.post_created, instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    caching.bump_feed_generation()
+    caching.bump_post_generation(instance.pk)
+    caching.bump_author_generation(instance.author_id)
+    caching.bump_group_generation(instance.group_id)
+    stats.decrement(instance.author_id, 'posts_count')
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    caching.bump_group_generation(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if instance.post_id is not None:
+        caching.bump_post_generation(instance.post_id)
+    if created:
+        stats.increment(instance.author_id, 'comments_count')
+        enqueue(tasks.comment_created, instance.post_id,
+                instance.created.timestamp())
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    if instance.post_id is not None:
+        caching.bump_post_generation(instance.post_id)
+    stats.decrement(instance.author_id, 'comments_count')
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        stats.increment(instance.author_id, 'followers_count')
+        stats.increment(instance.user_id, 'following_count')
+        # Кнопка «Отписаться» на закэшированных страницах подписчика.
+        caching.bump_timeline_generation(instance.user_id)
+        enqueue(tasks.follow_created, instance.user_id, instance.author_id,
+                timezone.now().timestamp())
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    stats.decrement(instance.author_id, 'followers_count')
+    stats.decrement(instance.user_id, 'following_count')
+    caching.bump_timeline_generation(instance.user_id)
+    enqueue(tasks.follow_deleted, instance.user_id, instance.author_id)
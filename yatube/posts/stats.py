@@ -0,0 +1,139 @@
+"""Денормализованные счётчики автора.
+
+Строка AuthorStats создаётся лениво: при первом чтении или первом
+увеличении счётчика она считается с нуля, дальше меняется через F()
+сигналами записи, на том же соединении, что и сама запись. Представления
+записи обёрнуты в transaction.atomic(), поэтому запись и счётчик
+фиксируются вместе; код, который пишет вне транзакции, этой гарантии
+не получает. В очередь задач счётчики не попадают, поэтому повтор задачи
+их не удваивает. Уменьшение счётчика никогда не создаёт строку, чтобы
+каскадное удаление пользователя не пыталось вставить статистику для
+удаляемой записи.
+
+refresh() и rebuild() пересчитывают строки целиком и нужны только для
+исправления расхождений.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import AuthorStats, Comment, Follow, Post
+
+User = get_user_model()
+
+COUNTERS = (
+    'posts_count',
+    'comments_count',
+    'followers_count',
+    'following_count',
+)
+
+
+def count(user_id):
+    return {
+        'posts_count': Post.objects.filter(author_id=user_id).count(),
+        'comments_count': Comment.objects.filter(author_id=user_id).count(),
+        'followers_count': Follow.objects.filter(author_id=user_id).count(),
+        'following_count': Follow.objects.filter(user_id=user_id).count(),
+    }
+
+
+def recount(user_id):
+    stats, _ = AuthorStats.objects.update_or_create(
+        user_id=user_id, defaults=count(user_id)
+    )
+    return stats
+
+
+def increment(user_id, counter):
+    with transaction.atomic():
+        updated = AuthorStats.objects.filter(user_id=user_id).update(
+            **{counter: F(counter) + 1}
+        )
+        if not updated:
+            recount(user_id)
+
+
+def decrement(user_id, counter):
+    AuthorStats.objects.filter(
+        user_id=user_id, **{f'{counter}__gt': 0}
+    ).update(**{counter: F(counter) - 1})
+
+
+def refresh(user_id, create=False):
+    """Пересчитывает строку; с create=True создаёт её, если её нет.
+
+    Без create строка не создаётся: пересчёт может идти и во время
+    каскадного удаления самого пользователя.
+    """
+    if create and User.objects.filter(pk=user_id).exists():
+        recount(user_id)
+    else:
+        AuthorStats.objects.filter(pk=user_id).update(**count(user_id))
+
+
+def stats_for(user_id):
+    try:
+        return AuthorStats.objects.get(pk=user_id)
+    except AuthorStats.DoesNotExist:
+        return recount(user_id)
+
+
+def get_stats(user):
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        stats = recount(user.pk)
+        user.stats = stats
+        return stats
+
+
+def _grouped(queryset, field):
+    return dict(
+        queryset.order_by().values_list(field).annotate(total=Count('pk'))
+    )
+
+
+def collect():
+    """Эталонные значения счётчиков для всех пользователей."""
+    totals = {
+        'posts_count': _grouped(Post.objects, 'author_id'),
+        'comments_count': _grouped(Comment.objects, 'author_id'),
+        'followers_count': _grouped(Follow.objects, 'author_id'),
+        'following_count': _grouped(Follow.objects, 'user_id'),
+    }
+    for user_id in User.objects.values_list('pk', flat=True).iterator():
+        yield user_id, {
+            counter: totals[counter].get(user_id, 0) for counter in COUNTERS
+        }
+
+
+def mismatches():
+    """Расхождения (user_id, counter, сохранено, ожидается).
+
+    Отсутствующая строка расхождением не считается: она будет
+    посчитана при первом чтении.
+    """
+    stored = {
+        stats.user_id: stats for stats in AuthorStats.objects.iterator()
+    }
+    for user_id, expected in collect():
+        stats = stored.get(user_id)
+        if stats is None:
+            continue
+        for counter in COUNTERS:
+            actual = getattr(stats, counter)
+            if actual != expected[counter]:
+                yield user_id, counter, actual, expected[counter]
+
+
+def rebuild():
+    """Перезаписывает счётчики всех пользователей; возвращает их число."""
+    rebuilt = 0
+    with transaction.atomic():
+        for user_id, expected in collect():
+            AuthorStats.objects.update_or_create(
+                user_id=user_id, defaults=expected
+            )
+            rebuilt += 1
+    return rebuilt
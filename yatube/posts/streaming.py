@@ -0,0 +1,94 @@
+"""Потоковая отдача длинных лент.
+
+В потоковом режиме (``?stream=1`` или POSTS_STREAMING = True) страница
+ленты рендерится с пустым местом под посты, отдаётся первым куском,
+а посты читаются через iterator(chunk_size=...) и отправляются по одному.
+Первый байт уходит сразу после рендера шапки, а в памяти воркера
+не бывает больше одной порции постов.
+"""
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.template.loader import get_template, render_to_string
+from django.utils.safestring import mark_safe
+
+from core import db_router, metrics, query_inspector
+
+from .paginators import CURSOR_PARAM, CursorPaginator, encode_cursor
+
+STREAM_PARAM = 'stream'
+STREAM_LIMIT: int = 500
+STREAM_CHUNK_SIZE: int = 100
+STREAM_MARKER = mark_safe('<!-- posts stream -->')
+
+
+def requested(request):
+    return (request.GET.get(STREAM_PARAM) == '1'
+            or getattr(settings, 'POSTS_STREAMING', False))
+
+
+def _posts(head, tail, rows, show_group_link):
+    yield head
+    item = get_template('posts/includes/stream_post.html')
+    more = get_template('posts/includes/stream_more.html')
+    last = None
+    for number, post in enumerate(rows.iterator(
+            chunk_size=STREAM_CHUNK_SIZE)):
+        if number == STREAM_LIMIT:
+            yield more.render({
+                'cursor': encode_cursor(last.pub_date, last.pk),
+            })
+            break
+        yield item.render({
+            'post': post,
+            'first': number == 0,
+            'show_group_link': show_group_link,
+        })
+        last = post
+    yield tail
+
+
+def _resumed(chunks, routing, request_metrics):
+    def step():
+        with ExitStack() as stack:
+            stack.enter_context(db_router.restored(routing))
+            if request_metrics is not None:
+                stack.enter_context(metrics.resumed(request_metrics))
+                stack.enter_context(
+                    query_inspector.wrap_connections(request_metrics))
+            return next(chunks, None)
+
+    try:
+        while True:
+            chunk = step()
+            if chunk is None:
+                return
+            yield chunk
+    finally:
+        chunks.close()
+
+
+def in_request_context(chunks):
+    """Генератор ответа выполняется, когда представление и middleware
+    уже вернули управление. Состояние запроса запоминается здесь, в
+    представлении, и восстанавливается на время каждой порции:
+    маршрутизация чтений (реплика, закрепление за основной базой)
+    и счётчики метрик. Между порциями поток остаётся чистым."""
+    return _resumed(chunks, db_router.snapshot(), metrics.current())
+
+
+def stream_page(request, template_name, context, queryset,
+                show_group_link=True):
+    """Страница ленты потоком: шапка, посты после курсора, подвал."""
+    rows = CursorPaginator(queryset, STREAM_LIMIT).queryset_after(
+        request.GET.get(CURSOR_PARAM)
+    )[:STREAM_LIMIT + 1]
+    shell = render_to_string(
+        template_name, {**context, 'stream_marker': STREAM_MARKER}, request
+    )
+    head, tail = shell.split(STREAM_MARKER, 1)
+    return StreamingHttpResponse(
+        in_request_context(_posts(head, tail, rows, show_group_link)),
+        content_type='text/html; charset=utf-8',
+    )
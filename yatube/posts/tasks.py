@@ -0,0 +1,58 @@
+"""Фоновые задачи после записи постов, комментариев и подписок.
+
+Аргументы — только id: к моменту выполнения объект может быть уже
+удалён. Задачи повторяются после ошибки, поэтому счётчики AuthorStats
+меняют сигналы в транзакции записи (posts/stats.py), а здесь только
+идемпотентные шаги: рассылка и чистка лент подписчиков. Счёт
+популярности (posts/trending.py) растёт на каждое событие, поэтому
+обновляется последним шагом задачи в своей транзакции: если задача
+упала, до него она не дошла.
+Миниатюры строит задача posts.thumbnails.generate.
+"""
+from datetime import datetime
+
+from django.utils import timezone
+
+from core.tasks import task
+
+from . import caching, thumbnails, timeline, trending  # noqa: F401
+from .models import Post
+
+
+def _moment(timestamp):
+    if timestamp is None:
+        return timezone.now()
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc)
+
+
+@task
+def post_created(post_id):
+    post = Post.objects.only('author', 'pub_date').filter(pk=post_id).first()
+    if post is not None:
+        timeline.fan_out_post(post)
+
+
+@task
+def comment_created(post_id, created=None):
+    if trending.add_event(
+            Post.objects.filter(pk=post_id),
+            trending.COMMENT_WEIGHT, _moment(created)):
+        caching.bump_trending_generation()
+
+
+@task
+def follow_created(user_id, author_id, followed=None):
+    timeline.backfill(user_id, author_id)
+    # Поколение сдвинул сигнал; здесь — чтобы лента показала
+    # разложенные посты.
+    caching.bump_timeline_generation(user_id)
+    moment = _moment(followed)
+    if trending.add_event(trending.recent_posts(Post, author_id, moment),
+                          trending.FOLLOW_WEIGHT, moment):
+        caching.bump_trending_generation()
+
+
+@task
+def follow_deleted(user_id, author_id):
+    timeline.trim(user_id, author_id)
+    caching.bump_timeline_generation(user_id)
@@ -0,0 +1,68 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import benchmark
+from ..models import Follow, Post, TimelineEntry
+from ..urls import urlpatterns
+
+
+class BenchmarkTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        benchmark.seed(users=5, posts=30, follows=6, groups=2)
+
+    def test_seed_builds_derived_data(self):
+        """Засев создаёт данные и ленты подписок."""
+        self.assertEqual(Post.objects.count(), 30)
+        self.assertEqual(Follow.objects.count(), 6)
+        self.assertTrue(TimelineEntry.objects.exists())
+
+    def test_measure_covers_every_route(self):
+        """Замер выполняется для каждого маршрута posts.urls."""
+        results = benchmark.measure(repeat=2)
+        self.assertEqual(
+            set(results), {pattern.name for pattern in urlpatterns}
+        )
+        self.assertEqual(results['index']['url'], reverse('posts:index'))
+        for name, result in results.items():
+            with self.subTest(name=name):
+                # Пустая форма поиска не обращается к базе: сессия
+                # и пользователь читаются из кэша.
+                if name != 'search':
+                    self.assertGreater(result['queries'], 0)
+                self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+
+    def test_measure_keeps_data(self):
+        """Подписка и отписка замеряются без изменения данных."""
+        follows = list(Follow.objects.values_list('pk', flat=True))
+        entries = TimelineEntry.objects.count()
+        benchmark.measure(repeat=2)
+        self.assertEqual(
+            list(Follow.objects.values_list('pk', flat=True)), follows)
+        self.assertEqual(TimelineEntry.objects.count(), entries)
+
+    def test_measure_fails_on_error_status(self):
+        """Замер пустой базы, где маршруты отвечают 404, — ошибка."""
+        Post.objects.all().delete()
+        with self.assertRaises(benchmark.BenchmarkError):
+            benchmark.measure(repeat=1)
+
+    def test_keepdb_refuses_in_memory_database(self):
+        with self.assertRaises(CommandError):
+            call_command('bench', keepdb=True, stdout=StringIO())
+
+    def test_compare_reports_regressions(self):
+        """Рост числа запросов и p95 сверх порога считается регрессией."""
+        baseline = {
+            'index': {'queries': 3, 'p95_ms': 10.0, 'peak_kb': 100.0},
+        }
+        results = {
+            'index': {'queries': 4, 'p95_ms': 25.0, 'peak_kb': 110.0},
+        }
+        regressions = benchmark.compare(results, baseline, threshold=2)
+        self.assertEqual(len(regressions), 2)
+        self.assertFalse(benchmark.compare(baseline, baseline, threshold=1))
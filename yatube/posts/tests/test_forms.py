@@ -1,12 +1,19 @@
 import shutil
 import tempfile
 from http import HTTPStatus
+from io import BytesIO
 
 from django.conf import settings
+from django.core.cache import caches
+from django.core.files.storage import default_storage
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
+from core.query_inspector import QueryRecorder, wrap_connections
+from posts import thumbnails
 from posts.models import Post, Group, User, Comment
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -36,6 +43,14 @@ class PostFormTests(TestCase):
         super().tearDownClass()
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
+    small_gif = (
+        b'\x47\x49\x46\x38\x39\x61\x01\x00'
+        b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+        b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+        b'\x00\x00\x01\x00\x01\x00\x00\x02'
+        b'\x02\x4c\x01\x00\x3b'
+    )
+
     def setUp(self):
         self.authorized_client = Client()
         self.authorized_client.force_login(self.author)
@@ -80,6 +95,115 @@ class PostFormTests(TestCase):
             ).exists()
         )
 
+    def test_thumbnail_url_saved_on_post(self):
+        """Миниатюра строится заранее и её URL хранится в посте."""
+        small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x01\x00'
+            b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+            b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+            b'\x00\x00\x01\x00\x01\x00\x00\x02'
+            b'\x02\x4c\x01\x00\x3b'
+        )
+        post = Post.objects.create(
+            author=self.author,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                name='thumb.gif',
+                content=small_gif,
+                content_type='image/gif'
+            ),
+        )
+        url = thumbnails.generate(post.pk)
+        post.refresh_from_db()
+        self.assertTrue(url)
+        self.assertEqual(post.thumbnail, url)
+        self.assertIn('image/webp',
+                      [source['type'] for source in post.image_sources])
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        )
+        self.assertContains(response, url)
+        self.assertContains(response, '<source type="image/webp"')
+        self.assertContains(response, '480w')
+
+    def test_variants_follow_exif_and_source_width(self):
+        """Варианты повёрнуты по EXIF и не шире оригинала."""
+        # Снимок 1200×600 с поворотом на 90° — на экране он 600×1200.
+        # Левая половина красная, правая синяя: после поворота цвета
+        # окажутся сверху и снизу, и центральная полоса станет одноцветной
+        # по горизонтали.
+        image = Image.new('RGB', (1200, 600), 'red')
+        image.paste('blue', (600, 0, 1200, 600))
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        buffer = BytesIO()
+        image.save(buffer, 'JPEG', exif=exif)
+        post = Post.objects.create(
+            author=self.author,
+            text='Снимок с телефона',
+            image=SimpleUploadedFile(
+                name='phone.jpg',
+                content=buffer.getvalue(),
+                content_type='image/jpeg'
+            ),
+        )
+        variants = thumbnails.build_variants(post)
+        self.assertIn('480w', variants['webp'])
+        self.assertNotIn('960w', variants['webp'])
+        name = f'{thumbnails.VARIANTS_DIR}/{post.pk}/phone_480.webp'
+        with default_storage.open(name) as stored:
+            variant = Image.open(stored).convert('RGB')
+            left = variant.getpixel((10, variant.height // 2))
+            right = variant.getpixel((variant.width - 10, variant.height // 2))
+        self.assertEqual(left[2] > left[0], right[2] > right[0])
+
+    def test_feed_shows_original_until_thumbnail_ready(self):
+        """Без готовой миниатюры лента не обращается к хранилищу sorl."""
+        post = Post.objects.create(
+            author=self.author,
+            text='Пост без миниатюры',
+            image=SimpleUploadedFile(
+                name='original.gif',
+                content=self.small_gif,
+                content_type='image/gif'
+            ),
+        )
+        caches['fragments'].clear()
+        with wrap_connections(QueryRecorder()) as recorder:
+            response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, post.image.url)
+        self.assertFalse(
+            [shape for shape in recorder.shapes
+             if 'thumbnail_kvstore' in shape]
+        )
+
+    def test_edit_text_keeps_thumbnail(self):
+        """Правка текста не сбрасывает и не перестраивает миниатюру."""
+        post = Post.objects.create(
+            author=self.author,
+            text='Пост с готовой миниатюрой',
+            image=SimpleUploadedFile(
+                name='ready.gif',
+                content=self.small_gif,
+                content_type='image/gif'
+            ),
+            thumbnail='/media/cache/ready.jpg',
+        )
+
+        def scheduled():
+            return [callback for _, callback in connection.run_on_commit
+                    if callback.__module__ == thumbnails.__name__]
+
+        pending = len(scheduled())
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.pk}),
+            data={'text': 'Новый текст'},
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.text, 'Новый текст')
+        self.assertEqual(post.thumbnail, '/media/cache/ready.jpg')
+        self.assertEqual(len(scheduled()), pending)
+
     def test_edit_post(self):
         """Валидная форма со страницы edit изменяет пост в базе данных."""
         posts_count = Post.objects.count()
@@ -1,7 +1,11 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.test import TestCase
 
-from ..models import Group, Post, REDUCTION_TEXT
+from ..models import AuthorStats, Comment, Follow, Group, Post, REDUCTION_TEXT
 
 User = get_user_model()
 
@@ -32,3 +36,44 @@ class PostModelTest(TestCase):
         group = PostModelTest.group
         expected_group_name = group.title
         self.assertEqual(expected_group_name, str(group))
+
+
+class AuthorStatsTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create(username='author')
+        self.reader = User.objects.create(username='reader')
+
+    def test_counters_follow_creates_and_deletes(self):
+        """Счётчики меняются при создании и удалении записей."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        Comment.objects.create(author=self.reader, post=post, text='Ок')
+        Follow.objects.create(user=self.reader, author=self.author)
+
+        author_stats = AuthorStats.objects.get(user=self.author)
+        reader_stats = AuthorStats.objects.get(user=self.reader)
+        self.assertEqual(author_stats.posts_count, 1)
+        self.assertEqual(author_stats.followers_count, 1)
+        self.assertEqual(reader_stats.comments_count, 1)
+        self.assertEqual(reader_stats.following_count, 1)
+
+        post.delete()
+        Follow.objects.all().delete()
+        author_stats.refresh_from_db()
+        reader_stats.refresh_from_db()
+        self.assertEqual(author_stats.posts_count, 0)
+        self.assertEqual(author_stats.followers_count, 0)
+        self.assertEqual(reader_stats.comments_count, 0)
+        self.assertEqual(reader_stats.following_count, 0)
+
+    def test_rebuild_command_fixes_drift(self):
+        """Команда находит и исправляет расхождения счётчиков."""
+        Post.objects.create(author=self.author, text='Пост')
+        AuthorStats.objects.filter(user=self.author).update(posts_count=7)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_author_stats', verify=True,
+                         stdout=StringIO())
+        call_command('rebuild_author_stats', stdout=StringIO())
+        call_command('rebuild_author_stats', verify=True, stdout=StringIO())
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).posts_count, 1
+        )
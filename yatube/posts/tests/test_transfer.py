@@ -0,0 +1,144 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from .. import trending
+from ..models import AuthorStats, Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class TransferCommandsTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create(username='author')
+        self.reader = User.objects.create(username='reader')
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        self.post = Post.objects.create(
+            author=self.author, group=self.group, text='Пост для выгрузки'
+        )
+        Comment.objects.create(
+            author=self.reader, post=self.post, text='Комментарий'
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def write(self, lines, suffix='.jsonl'):
+        handle, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(handle, 'w', encoding='utf-8') as stream:
+            stream.write(''.join(line + '\n' for line in lines))
+        self.addCleanup(os.remove, path)
+        return path
+
+    def export(self, kind, fmt):
+        handle, path = tempfile.mkstemp(suffix=f'.{fmt}')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        call_command('export_posts', kind=kind, format=fmt, output=path,
+                     stderr=StringIO())
+        return path
+
+    def test_export_import_roundtrip(self):
+        """Выгрузка и загрузка сохраняют посты, даты и связи."""
+        for fmt in ('jsonl', 'csv'):
+            with self.subTest(fmt=fmt):
+                pub_date = Post.objects.get(pk=self.post.pk).pub_date
+                paths = {kind: self.export(kind, fmt)
+                         for kind in ('posts', 'comments', 'follows')}
+                Post.objects.all().delete()
+                Follow.objects.all().delete()
+                for kind, path in paths.items():
+                    call_command('import_posts', path, kind=kind,
+                                 batch_size=1, stdout=StringIO())
+                post = Post.objects.get(pk=self.post.pk)
+                self.assertEqual(post.pub_date, pub_date)
+                self.assertEqual(post.group, self.group)
+                self.assertEqual(post.comments.count(), 1)
+                self.assertTrue(Follow.objects.filter(
+                    user=self.reader, author=self.author).exists())
+                self.assertEqual(
+                    AuthorStats.objects.get(user=self.author).posts_count, 1
+                )
+                comment = post.comments.get()
+                self.assertAlmostEqual(post.trending_score, trending.combine(
+                    trending.event_score(trending.POST_WEIGHT, pub_date),
+                    trending.event_score(
+                        trending.COMMENT_WEIGHT, comment.created),
+                ))
+
+    def test_import_skips_unknown_users(self):
+        """Записи с неизвестными авторами пропускаются без --create-users."""
+        path = self.write(['{"author": "ghost", "text": "Пост"}'])
+        call_command('import_posts', path, kind='posts', stdout=StringIO(),
+                     stderr=StringIO())
+        self.assertFalse(User.objects.filter(username='ghost').exists())
+        call_command('import_posts', path, kind='posts', create_users=True,
+                     stdout=StringIO())
+        self.assertTrue(Post.objects.filter(author__username='ghost').exists())
+
+    def test_imported_old_post_ranks_by_its_date(self):
+        """Старый пост без пересборки не попадает в начало «Популярного»."""
+        path = self.write([
+            '{"author": "author", "text": "Старый пост", '
+            '"pub_date": "2021-06-01T00:00:00+00:00"}',
+        ])
+        call_command('import_posts', path, kind='posts', skip_rebuild=True,
+                     stdout=StringIO())
+        old = Post.objects.get(text='Старый пост')
+        self.assertEqual(old.pub_date.year, 2021)
+        self.assertTrue(Post._meta.get_field('pub_date').auto_now_add)
+        self.assertLess(old.trending_score,
+                        Post.objects.get(pk=self.post.pk).trending_score)
+
+    def test_bad_records_reported_and_skipped(self):
+        """Неполные и неверные записи пропускаются с номером и причиной."""
+        path = self.write([
+            '{"author": "reader", "text": "Хороший комментарий", '
+            f'"post": {self.post.pk}}}',
+            '{"author": "reader", "text": "Без поста"}',
+            '{"author": "reader", "text": "", "post": 1}',
+            '{"author": "reader", "text": "Пост не число", "post": "x"}',
+            '{"author": "reader", "text": "Дата", '
+            f'"post": {self.post.pk}, "created": "вчера"}}',
+            '{не json',
+        ])
+        stdout, stderr = StringIO(), StringIO()
+        call_command('import_posts', path, kind='comments',
+                     stdout=stdout, stderr=stderr)
+        self.assertIn('Импортировано: 1, пропущено: 5', stdout.getvalue())
+        for number in range(2, 7):
+            self.assertIn(f'Запись {number} пропущена', stderr.getvalue())
+        self.assertTrue(Comment.objects.filter(
+            text='Хороший комментарий').exists())
+
+    def test_existing_ids_keep_their_dates(self):
+        """Запись с занятым id не переписывает существующий пост."""
+        pub_date = Post.objects.get(pk=self.post.pk).pub_date
+        path = self.write([
+            f'{{"id": {self.post.pk}, "author": "reader", "text": "Чужой", '
+            '"pub_date": "2021-06-01T00:00:00+00:00"}',
+        ])
+        call_command('import_posts', path, kind='posts', stdout=StringIO())
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(post.pub_date, pub_date)
+        self.assertEqual(post.text, 'Пост для выгрузки')
+
+    def test_rebuild_depends_on_kind(self):
+        """Импорт групп не пересобирает счётчики, импорт постов — да."""
+        AuthorStats.objects.filter(user=self.author).update(posts_count=7)
+        path = self.write([
+            '{"slug": "new_group", "title": "Новая группа"}',
+        ])
+        call_command('import_posts', path, kind='groups', stdout=StringIO())
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).posts_count, 7)
+        path = self.write(['{"author": "author", "text": "Ещё пост"}'])
+        call_command('import_posts', path, kind='posts', stdout=StringIO())
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).posts_count, 2)
@@ -1,14 +1,38 @@
+import math
+import re
+import shutil
+import tempfile
+from io import StringIO
+from unittest import skipUnless
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.cache import cache
-from django.test import Client, TestCase
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from django import forms
 
-from ..models import Group, Post, Follow
-from ..views import LIMIT_POSTS_ON_THE_PAGE
+from core.query_inspector import query_budget
+
+from .. import search, streaming, trending
+from ..models import Comment, Group, Post, Follow, TimelineEntry
+from ..paginators import CursorPage, encode_cursor
+from ..views import LIMIT_COMMENTS_ON_THE_PAGE, LIMIT_POSTS_ON_THE_PAGE
 
 User = get_user_model()
 NUMBER_POSTS_FOR_TEST_PAGINATOR = 13
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x01\x00'
+    b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+    b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+    b'\x00\x00\x01\x00\x01\x00\x00\x02'
+    b'\x02\x4c\x01\x00\x3b'
+)
 
 
 class PostPagesTests(TestCase):
@@ -89,18 +113,18 @@ class PostPagesTests(TestCase):
 
     def test_home_page_show_correct_context(self):
         """Шаблон index сформирован с правильным контекстом."""
+        cache.clear()
         response = self.authorized_client.get(reverse('posts:index'))
-        first_object = response.context['page_obj'][0]
-        post_text_0 = first_object.text
-        post_author_0 = first_object.author.username
-        post_id_0 = first_object.id
-        post_group_0 = first_object.group.id
-        post_image_0 = first_object.image
-        self.assertEqual(post_image_0, self.post.image)
-        self.assertEqual(post_group_0, self.group.id)
-        self.assertEqual(post_id_0, self.post.id)
-        self.assertEqual(post_text_0, self.post.text)
-        self.assertEqual(post_author_0, self.author.username)
+        # Лента приходит готовым фрагментом, поэтому проверяется разметка.
+        self.assertContains(response, f'<p>{self.post.text}</p>', html=True)
+        for url in (
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+        ):
+            with self.subTest(url=url):
+                self.assertContains(response, f'href="{url}"')
 
     def test_group_list_page_show_correct_context(self):
         """Шаблон group_list сформирован с правильным контекстом."""
@@ -136,19 +160,114 @@ class PostPagesTests(TestCase):
 
     def test_correct_cache_for_index_page(self):
         """Кэш главной страницы хранит посты пока не будет очищен."""
+        cache.clear()
         response = self.authorized_client.get(reverse('posts:index'))
-        post_count_before_del = response.content
-        Post.objects.all().delete()
+        content_before_update = response.content
+        Post.objects.all().update(text='Текст без сигналов')
         response2 = self.authorized_client.get(reverse('posts:index'))
-        post_count_after_del = response2.content
-        self.assertEqual(len(post_count_before_del), len(post_count_after_del))
+        self.assertEqual(content_before_update, response2.content)
         cache.clear()
         response3 = self.authorized_client.get(reverse('posts:index'))
-        post_count_after_clear = response3.content
-        self.assertNotEqual(
-            len(post_count_after_del),
-            len(post_count_after_clear)
+        self.assertContains(response3, 'Текст без сигналов')
+
+    def test_index_cache_invalidated_by_post_changes(self):
+        """Создание и удаление поста сразу видны на главной."""
+        cache.clear()
+        self.authorized_client.get(reverse('posts:index'))
+        new_post = Post.objects.create(
+            author=self.author,
+            text='Только что опубликован',
+        )
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Только что опубликован')
+        new_post.delete()
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'Только что опубликован')
+
+    def test_index_cache_shared_between_users(self):
+        """Фрагмент ленты общий для всех пользователей."""
+        cache.clear()
+        self.authorized_client.get(reverse('posts:index'))
+        Post.objects.all().update(text='Текст без сигналов')
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'Текст без сигналов')
+        self.assertContains(response, self.post.text)
+
+    def test_index_cache_hit_skips_pagination(self):
+        """При попадании в кэш посты не считаются и не выбираются."""
+        cache.clear()
+        self.client.get(reverse('posts:index'))
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, self.post.text)
+        post_queries = [query['sql'] for query in captured.captured_queries
+                        if Post._meta.db_table in query['sql']]
+        self.assertEqual(post_queries, [])
+
+    def test_pages_cached_for_anonymous(self):
+        """Группа, профиль и пост отдаются анонимам из кэша."""
+        cache.clear()
+        pages = [
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        ]
+        for page in pages:
+            self.client.get(page)
+        Post.objects.all().update(text='Текст без сигналов')
+        for page in pages:
+            with self.subTest(page=page):
+                with self.assertNumQueries(0):
+                    response = self.client.get(page)
+                self.assertContains(response, self.post.text)
+                self.assertIn('Cookie', response['Vary'])
+                self.assertNotContains(response, 'Выйти')
+
+    def test_page_cache_invalidated_by_changes(self):
+        """Комментарий, новый пост и подписка сбрасывают кэш страниц."""
+        cache.clear()
+        detail = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.client.get(detail)
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Свежий комментарий'
         )
+        self.assertContains(self.client.get(detail), 'Свежий комментарий')
+
+        reader = User.objects.create(username='Читатель')
+        reader_client = Client()
+        reader_client.force_login(reader)
+        profile = reverse('posts:profile', kwargs={'username': self.author})
+        response = reader_client.get(profile)
+        self.assertFalse(response.context['following'])
+        Follow.objects.create(user=reader, author=self.author)
+        response = reader_client.get(profile)
+        self.assertTrue(response.context['following'])
+
+        self.authorized_client.get(profile)
+        Post.objects.create(author=self.author, text='Ещё один пост')
+        response = self.authorized_client.get(profile)
+        self.assertEqual(response.context['posts_count'], 2)
+
+    def test_comment_resets_only_pages_with_its_post(self):
+        """Комментарий сбрасывает страницы со своим постом, но не чужие."""
+        other = Post.objects.create(
+            author=User.objects.create(username='Другой автор'),
+            text='Пост другого автора',
+        )
+        cache.clear()
+        detail = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        other_detail = reverse(
+            'posts:post_detail', kwargs={'post_id': other.pk})
+        profile = reverse('posts:profile', kwargs={'username': self.author})
+        for page in (detail, other_detail, profile):
+            self.client.get(page)
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Свежий комментарий'
+        )
+        with self.assertNumQueries(0):
+            self.client.get(other_detail)
+        self.assertContains(self.client.get(detail), 'Свежий комментарий')
+        self.assertContains(self.client.get(profile), 'Комментариев: 1')
 
 
 class PaginatorViewsTest(TestCase):
@@ -195,6 +314,120 @@ class PaginatorViewsTest(TestCase):
                              count_second_page)
 
 
+class CursorPaginatorViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(
+            username='Авторизованный пользователь'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        for post_number in range(NUMBER_POSTS_FOR_TEST_PAGINATOR):
+            Post.objects.create(
+                author=cls.author,
+                text=f'Тестовый пост {post_number}',
+                group=cls.group,
+            )
+        cls.namespaces = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': cls.group.slug}),
+            reverse('posts:profile', kwargs={'username': cls.author.username}),
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cursor_pages_walk_whole_feed(self):
+        """Курсоры next/previous обходят ленту без пропусков и повторов."""
+        expected = list(
+            Post.objects.order_by('-pub_date', '-pk').values_list(
+                'pk', flat=True)
+        )
+        for reverse_name in self.namespaces:
+            with self.subTest(reverse_name=reverse_name):
+                first = self.client.get(reverse_name + '?cursor=')
+                first_page = first.context['page_obj']
+                self.assertIsInstance(first_page, CursorPage)
+                self.assertEqual(len(first_page), LIMIT_POSTS_ON_THE_PAGE)
+                self.assertFalse(first_page.has_previous())
+                self.assertTrue(first_page.has_next())
+
+                second = self.client.get(
+                    reverse_name + '?cursor=' + first_page.next_cursor)
+                second_page = second.context['page_obj']
+                self.assertFalse(second_page.has_next())
+                self.assertEqual(
+                    [post.pk for post in first_page]
+                    + [post.pk for post in second_page],
+                    expected
+                )
+
+                back = self.client.get(
+                    reverse_name + '?cursor=' + second_page.previous_cursor)
+                self.assertEqual(
+                    [post.pk for post in back.context['page_obj']],
+                    [post.pk for post in first_page]
+                )
+
+    def test_feed_queries_do_not_grow_with_posts(self):
+        """Число запросов ленты не зависит от авторов и групп постов."""
+        reverse_name = reverse('posts:index')
+        with CaptureQueriesContext(connection) as before:
+            self.client.get(reverse_name + '?cursor=')
+        for number in range(LIMIT_POSTS_ON_THE_PAGE):
+            Post.objects.create(
+                author=User.objects.create(username=f'author_{number}'),
+                text='Пост другого автора',
+                group=Group.objects.create(
+                    title=f'Группа {number}',
+                    slug=f'group_{number}',
+                    description='Описание',
+                ),
+            )
+        cache.clear()
+        with CaptureQueriesContext(connection) as after:
+            response = self.client.get(reverse_name + '?cursor=')
+        self.assertContains(response, 'Пост другого автора')
+        self.assertEqual(len(before), len(after))
+
+    def test_follow_feed_cursor_pages(self):
+        """Лента подписок листается курсором по материализованной ленте."""
+        reader = User.objects.create(username='Читатель')
+        Follow.objects.create(user=reader, author=self.author)
+        client = Client()
+        client.force_login(reader)
+        reverse_name = reverse('posts:follow_index')
+        first_page = client.get(reverse_name + '?cursor=').context['page_obj']
+        self.assertEqual(len(first_page), LIMIT_POSTS_ON_THE_PAGE)
+        self.assertIsInstance(first_page[0], Post)
+        second_page = client.get(
+            reverse_name + '?cursor=' + first_page.next_cursor
+        ).context['page_obj']
+        self.assertEqual(
+            len(first_page) + len(second_page),
+            NUMBER_POSTS_FOR_TEST_PAGINATOR
+        )
+        self.assertFalse(
+            {post.pk for post in first_page}
+            & {post.pk for post in second_page}
+        )
+
+    def test_feed_queries_use_indexes(self):
+        """EXPLAIN лент не содержит полных просмотров и сортировок."""
+        call_command('check_feed_indexes', stdout=StringIO())
+
+    def test_broken_cursor_returns_first_page(self):
+        """Испорченный курсор открывает первую страницу."""
+        response = self.client.get(reverse('posts:index') + '?cursor=%%%')
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), LIMIT_POSTS_ON_THE_PAGE)
+        self.assertFalse(page_obj.has_previous())
+
+
 class FollowTests(TestCase):
     def setUp(self):
         self.client_following = Client()
@@ -275,3 +508,445 @@ class FollowTests(TestCase):
             reverse('posts:follow_index'))
         new_posts_unfollower = unfollower_responce.context['page_obj']
         self.assertEqual((len(new_posts_unfollower)), 0)
+
+    def test_new_post_fans_out_to_follower_timeline(self):
+        """Новый пост автора попадает в материализованную ленту."""
+        Follow.objects.create(user=self.user_follower,
+                              author=self.user_following)
+        new_post = Post.objects.create(
+            author=self.user_following,
+            text='Свежий пост'
+        )
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.user_follower,
+            post=new_post,
+        ).exists())
+        response = self.client_follower.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['page_obj'][0], new_post)
+
+    def test_unfollow_trims_timeline(self):
+        """Отписка удаляет посты автора из материализованной ленты."""
+        Follow.objects.create(user=self.user_follower,
+                              author=self.user_following)
+        self.client_follower.get(reverse(
+            'posts:profile_unfollow',
+            kwargs={'username': self.user_following.username})
+        )
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.user_follower).exists())
+
+    @override_settings(TIMELINE_PULL_THRESHOLD=1)
+    def test_popular_author_posts_are_pulled(self):
+        """Посты популярного автора читаются без раскладки по лентам."""
+        Follow.objects.create(user=self.user_follower,
+                              author=self.user_following)
+        new_post = Post.objects.create(
+            author=self.user_following,
+            text='Пост популярного автора'
+        )
+        self.assertFalse(TimelineEntry.objects.filter(
+            post=new_post).exists())
+        response = self.client_follower.get(reverse('posts:follow_index'))
+        self.assertIn(new_post, response.context['page_obj'])
+        self.assertIn(self.post, response.context['page_obj'])
+
+    @override_settings(TIMELINE_PULL_THRESHOLD=2)
+    def test_mixed_feed_merges_pushed_and_pulled_posts(self):
+        """Лента из раскладки и pull-авторов листается без повторов
+        и без DISTINCT."""
+        quiet = User.objects.create(username='Тихий автор')
+        Follow.objects.create(user=self.user_follower, author=quiet)
+        # До второго подписчика посты автора раскладывались по ленте.
+        Follow.objects.create(user=self.user_follower,
+                              author=self.user_following)
+        Follow.objects.create(user=quiet, author=self.user_following)
+        for number in range(LIMIT_POSTS_ON_THE_PAGE):
+            Post.objects.create(author=quiet, text=f'Тихий {number}')
+            Post.objects.create(author=self.user_following,
+                                text=f'Громкий {number}')
+        expected = list(Post.objects.filter(
+            author__in=[quiet, self.user_following]
+        ).order_by('-pub_date', '-pk'))
+        url = reverse('posts:follow_index')
+        with CaptureQueriesContext(connection) as captured:
+            pages = [self.client_follower.get(url, {'page': number})
+                     for number in (1, 2, 3)]
+        self.assertEqual(
+            [post for page in pages for post in page.context['page_obj']],
+            expected)
+        for query in captured.captured_queries:
+            self.assertNotIn('DISTINCT', query['sql'])
+        with override_settings(POSTS_PAGINATION='cursor'):
+            found, cursor = [], None
+            for _ in range(3):
+                page_obj = self.client_follower.get(
+                    url, {'cursor': cursor} if cursor else {}
+                ).context['page_obj']
+                found += list(page_obj)
+                cursor = page_obj.next_cursor
+            self.assertIsNone(cursor)
+        self.assertEqual(found, expected)
+
+
+class SearchViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='Искатель')
+        cls.relevant = Post.objects.create(
+            author=cls.author,
+            text='Котики котики котики и немного собак',
+        )
+        cls.mentioned = Post.objects.create(
+            author=cls.author,
+            text='Про собак, но один раз упомянуты котики',
+        )
+        cls.other = Post.objects.create(
+            author=cls.author,
+            text='Совсем другая тема',
+        )
+
+    def found(self, query, **params):
+        response = self.client.get(
+            reverse('posts:search'), {'q': query, **params}
+        )
+        return [post.pk for post in response.context['page_obj']]
+
+    def test_search_ranks_results(self):
+        """Поиск находит посты по словам и ранжирует по релевантности."""
+        self.assertEqual(
+            self.found('котики'), [self.relevant.pk, self.mentioned.pk]
+        )
+        self.assertEqual(self.found('котик'), self.found('котики'))
+        self.assertEqual(self.found('другая тема'), [self.other.pk])
+        self.assertEqual(self.found(''), [])
+        self.assertEqual(self.found('"*) OR NEAR('), [])
+
+    def test_search_index_follows_edits(self):
+        """Индекс обновляется при изменении и удалении поста."""
+        post = Post.objects.create(author=self.author, text='Жирафы')
+        self.assertEqual(self.found('жирафы'), [post.pk])
+        post.text = 'Слоны'
+        post.save()
+        self.assertEqual(self.found('жирафы'), [])
+        self.assertEqual(self.found('слоны'), [post.pk])
+        post.delete()
+        self.assertEqual(self.found('слоны'), [])
+
+    def test_search_pagination(self):
+        """Выдача разбивается на страницы."""
+        for number in range(search.SEARCH_RESULTS_ON_THE_PAGE + 2):
+            Post.objects.create(author=self.author, text=f'Пингвин {number}')
+        first = self.client.get(reverse('posts:search'), {'q': 'пингвин'})
+        self.assertTrue(first.context['page_obj'].has_next())
+        self.assertEqual(len(self.found('пингвин', page=2)), 2)
+        self.assertEqual(
+            set(self.found('пингвин')) & set(self.found('пингвин', page=2)),
+            set(),
+        )
+
+    @skipUnless(connection.vendor == 'sqlite', 'триггеры FTS5 SQLite')
+    def test_rebuild_search_index(self):
+        """Команда восстанавливает индекс после потери триггеров."""
+        with connection.cursor() as cursor:
+            for sql in search.SQLITE_UNINSTALL[:-1]:
+                cursor.execute(sql)
+        Post.objects.filter(pk=self.other.pk).update(text='Пересобрано')
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.found('пересобрано'), [self.other.pk])
+        self.assertEqual(self.found('другая'), [])
+
+
+class CommentPaginationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='Комментатор')
+        cls.post = Post.objects.create(author=cls.author, text='Обсуждаемый')
+        readers = [
+            User.objects.create(username=f'Читатель {number}')
+            for number in range(5)
+        ]
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=readers[number % len(readers)],
+                    text=f'Комментарий {number}')
+            for number in range(LIMIT_COMMENTS_ON_THE_PAGE * 2 + 3)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_post_detail_shows_first_comments(self):
+        """На странице поста первая порция комментариев по порядку."""
+        detail = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(detail)
+        comments = response.context['comments']
+        self.assertEqual(len(comments), LIMIT_COMMENTS_ON_THE_PAGE)
+        self.assertEqual(comments[0].text, 'Комментарий 0')
+        self.assertTrue(comments.has_next())
+        self.assertContains(response, 'data-comments-more')
+        self.assertLess(len(captured), 10)
+
+    def test_load_more_walks_all_comments(self):
+        """Фрагмент «Показать ещё» отдаёт следующие порции без повторов."""
+        url = reverse('posts:post_comments', kwargs={'post_id': self.post.pk})
+        texts = []
+        cursor = ''
+        while cursor is not None:
+            response = self.client.get(url, {'cursor': cursor})
+            self.assertTemplateUsed(response, 'posts/includes/comments.html')
+            self.assertTemplateNotUsed(response, 'base.html')
+            page = response.context['comments']
+            texts += [comment.text for comment in page]
+            cursor = page.next_cursor
+        self.assertEqual(
+            texts,
+            list(Comment.objects.order_by('created', 'pk').values_list(
+                'text', flat=True)),
+        )
+
+    def test_comments_of_missing_post(self):
+        url = reverse('posts:post_comments', kwargs={'post_id': 0})
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class StreamingViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='Потоковый автор')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        for number in range(NUMBER_POSTS_FOR_TEST_PAGINATOR):
+            Post.objects.create(author=cls.author, group=cls.group,
+                                text=f'Потоковый пост {number}')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feeds_stream_all_posts(self):
+        """Ленты в потоковом режиме отдают все посты без пагинации."""
+        pages = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+        ]
+        for page in pages:
+            with self.subTest(page=page):
+                response = self.client.get(page, {'stream': '1'})
+                self.assertTrue(response.streaming)
+                html = b''.join(response.streaming_content).decode()
+                self.assertEqual(
+                    html.count('подробная информация'),
+                    NUMBER_POSTS_FOR_TEST_PAGINATOR,
+                )
+                self.assertIn('Потоковый пост 0', html)
+                self.assertTrue(html.rstrip().endswith('</html>'))
+                self.assertNotIn(str(streaming.STREAM_MARKER), html)
+
+    def test_stream_limit_links_to_next_part(self):
+        """После STREAM_LIMIT постов поток предлагает продолжение."""
+        url = reverse('posts:index')
+        with self.settings(POSTS_STREAMING=True):
+            original = streaming.STREAM_LIMIT
+            streaming.STREAM_LIMIT = 5
+            try:
+                first = b''.join(
+                    self.client.get(url).streaming_content).decode()
+                cursor = re.search(r'cursor=([\w=-]+)', first).group(1)
+                second = b''.join(self.client.get(
+                    url, {'cursor': cursor}).streaming_content).decode()
+            finally:
+                streaming.STREAM_LIMIT = original
+        self.assertEqual(first.count('подробная информация'), 5)
+        self.assertIn('Потоковый пост 12', first)
+        self.assertIn('Потоковый пост 7', second)
+        self.assertNotIn('Потоковый пост 8', second)
+
+
+class QueryBudgetTest(TestCase):
+    """Бюджеты запросов страниц с холодным кэшем.
+
+    Авторы постов и комментариев разные, поэтому любая ленивая загрузка
+    связанного объекта в шаблоне даёт повторяющиеся запросы и роняет тест.
+    У постов есть картинки без готовых миниатюр: обращение ленты к sorl
+    на каждый пост тоже роняет тест.
+    """
+
+    BUDGETS = {
+        'index': 4,
+        'popular': 4,
+        'group_list': 5,
+        'profile': 6,
+        'post_detail': 5,
+        'post_comments': 4,
+        'follow_index': 5,
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        cls.media = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media.enable()
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.group = Group.objects.create(
+            title='Группа', slug='budget', description='Описание')
+        cls.reader = User.objects.create(username='Читатель')
+        authors = [
+            User.objects.create(username=f'Автор {number}')
+            for number in range(LIMIT_POSTS_ON_THE_PAGE)
+        ]
+        for author in authors:
+            Post.objects.create(
+                author=author,
+                group=cls.group,
+                text='Пост',
+                image=SimpleUploadedFile(
+                    name='budget.gif',
+                    content=SMALL_GIF,
+                    content_type='image/gif',
+                ),
+            )
+            Follow.objects.create(user=cls.reader, author=author)
+        cls.post = Post.objects.first()
+        for author in authors:
+            Comment.objects.create(
+                post=cls.post, author=author, text='Комментарий')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    def setUp(self):
+        self.client.force_login(self.reader)
+
+    def test_pages_fit_query_budget(self):
+        kwargs = {
+            'group_list': {'slug': self.group.slug},
+            'profile': {'username': 'Автор 0'},
+            'post_detail': {'post_id': self.post.pk},
+            'post_comments': {'post_id': self.post.pk},
+        }
+        for name, budget in self.BUDGETS.items():
+            with self.subTest(name=name):
+                for alias in ('default', 'fragments'):
+                    caches[alias].clear()
+                url = reverse(f'posts:{name}', kwargs=kwargs.get(name))
+                with query_budget(budget, threshold=2):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+
+class PopularFeedTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.other = User.objects.create(username='Другой')
+        cls.reader = User.objects.create(username='Читатель')
+        cls.posts = [
+            Post.objects.create(author=cls.other, text=f'Пост {number}')
+            for number in range(LIMIT_POSTS_ON_THE_PAGE + 3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        caches['fragments'].clear()
+
+    def score(self, post):
+        return Post.objects.get(pk=post.pk).trending_score
+
+    def test_score_math(self):
+        """Событие через период полураспада весит вдвое больше."""
+        moment = timezone.now()
+        later = trending.event_score(
+            1, moment + trending.TRENDING_HALF_LIFE)
+        self.assertAlmostEqual(
+            later - trending.event_score(1, moment), math.log(2))
+        self.assertAlmostEqual(
+            trending.combine(1.0, 2.0), math.log(math.e + math.e ** 2))
+
+    def test_comment_raises_only_its_post(self):
+        """Комментарий поднимает старый пост и не трогает остальные."""
+        oldest, newest = self.posts[0], self.posts[-1]
+        untouched = self.score(self.posts[1])
+        self.assertLess(self.score(oldest), self.score(newest))
+        for number in range(2):
+            Comment.objects.create(
+                post=oldest, author=self.reader, text=f'Комментарий {number}')
+        self.assertGreater(self.score(oldest), self.score(newest))
+        self.assertEqual(self.score(self.posts[1]), untouched)
+        response = self.client.get(reverse('posts:popular'))
+        self.assertEqual(response.context['page_obj'][0], oldest)
+
+    def test_follow_raises_recent_posts_of_author(self):
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        before = self.score(post)
+        other_before = self.score(self.posts[-1])
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertGreater(self.score(post), before)
+        self.assertEqual(self.score(self.posts[-1]), other_before)
+
+    def test_cursor_pages_walk_whole_feed(self):
+        """Курсор проходит ленту по убыванию счёта без повторов."""
+        Comment.objects.create(
+            post=self.posts[3], author=self.reader, text='Комментарий')
+        url = reverse('posts:popular')
+        seen = []
+        cursor = ''
+        query_counts = set()
+        while cursor is not None:
+            with CaptureQueriesContext(connection) as captured:
+                page = self.client.get(
+                    url, {'cursor': cursor}).context['page_obj']
+            query_counts.add(len(captured))
+            seen += [post.pk for post in page]
+            cursor = page.next_cursor
+        self.assertEqual(seen, list(Post.objects.order_by(
+            '-trending_score', '-pk').values_list('pk', flat=True)))
+        self.assertEqual(seen[0], self.posts[3].pk)
+        self.assertEqual(len(query_counts), 1)
+
+    def test_cursor_skips_posts_raised_while_paging(self):
+        """Поднявшийся во время листания пост не повторяется и не
+        попадает на следующую страницу."""
+        url = reverse('posts:popular')
+        first = self.client.get(url).context['page_obj']
+        shown = {post.pk for post in first}
+        raised = Post.objects.exclude(pk__in=shown).order_by(
+            'trending_score').first()
+        for number in range(3):
+            Comment.objects.create(
+                post=raised, author=self.reader, text=f'Комментарий {number}')
+        second = self.client.get(
+            url, {'cursor': first.next_cursor}).context['page_obj']
+        pks = [post.pk for post in second]
+        self.assertFalse(shown & set(pks))
+        self.assertNotIn(raised.pk, pks)
+        self.assertEqual(len(shown) + len(pks) + 1, len(self.posts))
+        self.assertEqual(
+            self.client.get(url).context['page_obj'][0], raised)
+
+    def test_date_cursor_returns_first_page(self):
+        token = encode_cursor(timezone.now(), self.posts[0].pk)
+        response = self.client.get(reverse('posts:popular'), {'cursor': token})
+        self.assertFalse(response.context['page_obj'].has_previous())
+
+    def test_rebuild_matches_incremental_scores(self):
+        """Пересчёт с нуля даёт те же счета, что и события по одному."""
+        Comment.objects.create(
+            post=self.posts[0], author=self.reader, text='Комментарий')
+        expected = dict(Post.objects.values_list('pk', 'trending_score'))
+        Post.objects.update(trending_score=0)
+        call_command('rebuild_trending', stdout=StringIO())
+        for pk, score in Post.objects.values_list('pk', 'trending_score'):
+            with self.subTest(pk=pk):
+                self.assertAlmostEqual(score, expected[pk], places=3)
@@ -0,0 +1,164 @@
+"""Генерация миниатюр при сохранении поста.
+
+Миниатюра строится фоновой задачей (или в пуле потоков, если воркера
+нет) после коммита транзакции, а её URL записывается в Post.thumbnail,
+поэтому шаблоны не обращаются к sorl во время запроса. Пока миниатюра
+не готова, показывается оригинал, обрезанный CSS до тех же пропорций.
+
+Вместе с миниатюрой строятся варианты нескольких ширин в WebP (и AVIF,
+если его поддерживает установленный Pillow) для <picture>/srcset.
+"""
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+from sorl.thumbnail import get_thumbnail
+
+from core.tasks import enqueue, is_eager, task
+
+from . import caching
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_GEOMETRY = '960x339'
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+THUMBNAIL_WORKERS: int = 2
+THUMBNAIL_RATIO = 339 / 960
+
+VARIANT_WIDTHS = (480, 960, 1440)
+VARIANT_FORMATS = (
+    ('AVIF', 'avif', {'quality': 60}),
+    ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+)
+VARIANTS_DIR = 'posts/variants'
+
+_executor = None
+
+
+def workers():
+    return getattr(settings, 'POSTS_THUMBNAIL_WORKERS', THUMBNAIL_WORKERS)
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=workers(),
+            thread_name_prefix='thumbnails',
+        )
+    return _executor
+
+
+def supported_formats():
+    Image.init()
+    return [
+        (image_format, extension, options)
+        for image_format, extension, options in VARIANT_FORMATS
+        if image_format in Image.SAVE
+    ]
+
+
+def _save_variant(name, image, image_format, options):
+    buffer = BytesIO()
+    image.save(buffer, image_format, **options)
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def build_variants(post):
+    """Сохраняет варианты картинки и возвращает srcset по форматам."""
+    stem = os.path.splitext(os.path.basename(post.image.name))[0]
+    post.image.open('rb')
+    try:
+        source = Image.open(post.image)
+        source.load()
+    finally:
+        post.image.close()
+    # Снимки с телефонов хранят поворот в EXIF; sorl его учитывает,
+    # а без transpose варианты в <picture> лежали бы на боку.
+    source = ImageOps.exif_transpose(source)
+    if source.mode not in ('RGB', 'RGBA'):
+        source = source.convert('RGBA')
+    # Варианты шире оригинала только растягивают его и весят больше;
+    # самая узкая ширина остаётся всегда, как и у миниатюры с upscale.
+    widths = [
+        width for width in VARIANT_WIDTHS if width <= source.width
+    ] or VARIANT_WIDTHS[:1]
+    variants = {}
+    for image_format, extension, options in supported_formats():
+        sources = []
+        for width in widths:
+            size = (width, round(width * THUMBNAIL_RATIO))
+            resized = ImageOps.fit(source, size, Image.LANCZOS)
+            name = _save_variant(
+                f'{VARIANTS_DIR}/{post.pk}/{stem}_{width}.{extension}',
+                resized, image_format, options,
+            )
+            sources.append(f'{default_storage.url(name)} {width}w')
+        variants[extension] = ', '.join(sources)
+    return variants
+
+
+@task
+def generate(post_id):
+    """Строит миниатюру и варианты картинки, сохраняет их в посте."""
+    post = Post.objects.only('image').filter(pk=post_id).first()
+    if post is None:
+        return None
+    url = ''
+    variants = {}
+    if post.image:
+        url = get_thumbnail(
+            post.image, THUMBNAIL_GEOMETRY, **THUMBNAIL_OPTIONS
+        ).url
+        variants = build_variants(post)
+    # Картинку могли заменить, пока строилась миниатюра.
+    updated = Post.objects.filter(pk=post_id, image=post.image.name).update(
+        thumbnail=url,
+        image_variants=json.dumps(variants) if variants else '',
+    )
+    if updated:
+        # update() не отправляет сигналы, а миниатюра попадает в кэш страниц.
+        caching.bump_post_generation(post_id)
+    return url
+
+
+def _generate(post_id):
+    try:
+        generate(post_id)
+    except Exception:
+        logger.exception('Не удалось построить миниатюру поста %s', post_id)
+
+
+def _run(post_id):
+    try:
+        _generate(post_id)
+    finally:
+        connections.close_all()
+
+
+def schedule(post):
+    """Ставит построение миниатюры в очередь задач.
+
+    Без воркера (TASKS_EAGER) миниатюра строится в пуле потоков процесса
+    после коммита транзакции, чтобы не задерживать ответ. При
+    POSTS_THUMBNAIL_WORKERS = 0 — в том же потоке после коммита.
+    """
+    if not post.image:
+        return
+    post_id = post.pk
+    if is_eager() and not workers():
+        transaction.on_commit(lambda: _generate(post_id))
+    elif is_eager():
+        transaction.on_commit(lambda: get_executor().submit(_run, post_id))
+    else:
+        enqueue(generate, post_id)
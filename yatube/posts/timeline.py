@@ -0,0 +1,217 @@
+"""Материализованная лента подписок (fan-out on write).
+
+Новый пост раскладывается по лентам подписчиков автора в TimelineEntry,
+поэтому follow_index читает готовый диапазон по индексу (user, pub_date)
+вместо соединения Follow и Post на каждый запрос. Посты авторов
+с очень большим числом подписчиков не раскладываются, а подтягиваются
+при чтении (pull), чтобы одна публикация не порождала миллионы вставок.
+"""
+import heapq
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import F, Q
+
+from . import stats
+from .models import (Follow, Post, PostQuerySet, TimelineEntry,
+                     comments_count)
+
+TIMELINE_PULL_THRESHOLD: int = 10000
+TIMELINE_BACKFILL_LIMIT: int = 200
+TIMELINE_BATCH_SIZE: int = 1000
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _bulk_insert(entries):
+    batch_size = _setting('TIMELINE_BATCH_SIZE', TIMELINE_BATCH_SIZE)
+    entries = iter(entries)
+    while True:
+        batch = list(islice(entries, batch_size))
+        if not batch:
+            break
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def is_pull_author(author_id):
+    threshold = _setting('TIMELINE_PULL_THRESHOLD', TIMELINE_PULL_THRESHOLD)
+    return stats.stats_for(author_id).followers_count >= threshold
+
+
+def pull_authors(user):
+    """Авторы из подписок пользователя, чьи посты читаются напрямую."""
+    threshold = _setting('TIMELINE_PULL_THRESHOLD', TIMELINE_PULL_THRESHOLD)
+    return list(
+        Follow.objects.filter(
+            user=user, author__stats__followers_count__gte=threshold
+        ).values_list('author_id', flat=True)
+    )
+
+
+def fan_out_post(post):
+    if is_pull_author(post.author_id):
+        return
+    follower_ids = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True).iterator()
+    _bulk_insert(
+        TimelineEntry(user_id=user_id, post_id=post.pk,
+                      author_id=post.author_id, pub_date=post.pub_date)
+        for user_id in follower_ids
+    )
+
+
+def backfill(user_id, author_id):
+    if is_pull_author(author_id):
+        return
+    limit = _setting('TIMELINE_BACKFILL_LIMIT', TIMELINE_BACKFILL_LIMIT)
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date').values_list('pk', 'pub_date')[:limit]
+    _bulk_insert(
+        TimelineEntry(user_id=user_id, post_id=pk,
+                      author_id=author_id, pub_date=pub_date)
+        for pk, pub_date in posts
+    )
+
+
+def trim(user_id, author_id):
+    TimelineEntry.objects.filter(
+        user_id=user_id, author_id=author_id
+    ).delete()
+
+
+def follow_feed(user):
+    """Лента подписок пользователя.
+
+    Пока среди подписок нет авторов в режиме pull, лента читается прямо
+    из TimelineEntry по индексу (user, pub_date, id) и возвращает записи
+    ленты; посты из них достаёт as_posts() уже после пагинации. Иначе
+    записи ленты и посты каждого автора в режиме pull читаются
+    отдельными запросами и сливаются в MergedFeed.
+    """
+    pulled = pull_authors(user)
+    if not pulled:
+        return TimelineEntry.objects.filter(user=user).select_related(
+            'post__author', 'post__group'
+        ).only(
+            'pub_date', 'post',
+            *(f'post__{field}' for field in PostQuerySet.FEED_FIELDS)
+        ).annotate(comments_count=comments_count('post_id'))
+    # Записи ленты сортируются по дате из TimelineEntry: так запрос идёт
+    # по индексу (user, pub_date, id), а не сортирует всю ленту.
+    pushed = Post.objects.feed().filter(
+        timeline_entries__user=user
+    ).exclude(author_id__in=pulled).annotate(
+        entry_pub_date=F('timeline_entries__pub_date'))
+    return MergedFeed(
+        [(pushed, {'pub_date': 'entry_pub_date'})]
+        + [(Post.objects.feed().filter(author_id=author_id), {})
+           for author_id in pulled]
+    )
+
+
+def _renamed_lookup(lookup, fields):
+    name, separator, rest = lookup.partition('__')
+    return fields.get(name, name) + separator + rest
+
+
+def _renamed(condition, fields):
+    return Q._new_instance(
+        [_renamed(child, fields) if isinstance(child, Q)
+         else (_renamed_lookup(child[0], fields), child[1])
+         for child in condition.children],
+        condition.connector, condition.negated,
+    )
+
+
+class MergedFeed:
+    """Лента постов из нескольких запросов, слитых в Python.
+
+    Каждая часть — отдельный keyset-запрос по своему индексу; для
+    страницы из каждой части берётся не больше строк, чем нужно, и части
+    сливаются по ключу сортировки. Части не пересекаются, поэтому
+    DISTINCT не нужен. Поддерживает то, чем пользуются Paginator
+    и CursorPaginator: order_by(), filter(), count() и срезы.
+
+    parts — пары (queryset, fields): fields переименовывает поля ключа
+    для запроса части, например pub_date в дату записи ленты.
+    """
+
+    model = Post
+    ordered = True
+
+    def __init__(self, parts, ordering=('-pub_date', '-pk')):
+        self.parts = parts
+        self.ordering = ordering
+
+    def __repr__(self):
+        return '<MergedFeed: %s parts>' % len(self.parts)
+
+    def order_by(self, *ordering):
+        return MergedFeed([
+            (queryset.order_by(*(
+                ('-' if name.startswith('-') else '')
+                + _renamed_lookup(name.lstrip('-'), fields)
+                for name in ordering)), fields)
+            for queryset, fields in self.parts
+        ], ordering)
+
+    def filter(self, *args, **kwargs):
+        return MergedFeed([
+            (queryset.filter(
+                *(_renamed(condition, fields) for condition in args),
+                **{_renamed_lookup(lookup, fields): value
+                   for lookup, value in kwargs.items()}), fields)
+            for queryset, fields in self.parts
+        ], self.ordering)
+
+    def count(self):
+        return sum(queryset.count() for queryset, _ in self.parts)
+
+    def _key(self, post):
+        return tuple(getattr(post, name.lstrip('-'))
+                     for name in self.ordering)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop = index.start or 0, index.stop
+        rows = heapq.merge(
+            *(queryset[:stop] if stop is not None else queryset.iterator()
+              for queryset, _ in self.parts),
+            key=self._key, reverse=self.ordering[0].startswith('-'),
+        )
+        return list(islice(rows, start, stop))
+
+    def __iter__(self):
+        return iter(self[0:None])
+
+
+def as_posts(page):
+    """Заменяет записи ленты на страницы их постами."""
+    posts = []
+    for row in page.object_list:
+        if isinstance(row, TimelineEntry):
+            row.post.comments_count = row.comments_count
+            row = row.post
+        posts.append(row)
+    page.object_list = posts
+    return page
+
+
+def rebuild(user=None):
+    """Пересобирает ленты с нуля; возвращает число обработанных подписок."""
+    follows = Follow.objects.all()
+    entries = TimelineEntry.objects.all()
+    if user is not None:
+        follows = follows.filter(user=user)
+        entries = entries.filter(user=user)
+    entries.delete()
+    processed = 0
+    for user_id, author_id in follows.values_list(
+            'user_id', 'author_id').iterator():
+        backfill(user_id, author_id)
+        processed += 1
+    return processed
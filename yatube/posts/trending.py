@@ -0,0 +1,101 @@
+"""Счёт популярности постов с затуханием по времени.
+
+Каждое событие — публикация поста, комментарий, подписка на автора —
+добавляет к счёту поста вес, который вдвое затухает за
+TRENDING_HALF_LIFE. Затухание одинаково для всех постов, поэтому счёт
+хранится приведённым к фиксированной эпохе, в логарифме, чтобы не
+переполнить float:
+
+    trending_score = ln(Σ weight · 2 ** ((t - TRENDING_EPOCH) / HALF_LIFE))
+
+В любой момент порядок таких счётов совпадает с порядком затухших сумм.
+Новое событие меняет только счёт своего поста, а старые счета не
+пересчитываются: лента «Популярное» — обычная keyset-пагинация по индексу
+(-trending_score, -id).
+
+Удаление комментариев и отписки счёт не уменьшают; точные значения
+по всем комментариям восстанавливает manage.py rebuild_trending.
+
+Курсор «Популярного» — позиция (счёт, id), а не снимок ленты. Между
+пересборками счета только растут, поэтому уже показанный пост не
+повторится на следующих страницах; но пост, поднявшийся выше курсора,
+пока читатель листает, на них тоже не попадёт — его видно с первой
+страницы.
+"""
+import math
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+TRENDING_EPOCH = datetime(2021, 1, 1, tzinfo=timezone.utc)
+TRENDING_HALF_LIFE = timedelta(hours=24)
+POST_WEIGHT = 1.0
+COMMENT_WEIGHT = 1.0
+FOLLOW_WEIGHT = 2.0
+# Подписка поднимает только свежие посты автора, а не всю его историю.
+FOLLOW_BOOST_POSTS: int = 20
+FOLLOW_BOOST_WINDOW = timedelta(days=3)
+REBUILD_BATCH_SIZE: int = 500
+
+
+def event_score(weight, moment):
+    """Вклад события веса weight в момент moment."""
+    elapsed = (moment - TRENDING_EPOCH) / TRENDING_HALF_LIFE
+    return math.log(weight) + elapsed * math.log(2)
+
+
+def combine(score, addition):
+    """ln(e ** score + e ** addition) без переполнения."""
+    high, low = max(score, addition), min(score, addition)
+    return high + math.log1p(math.exp(low - high))
+
+
+def initial_score():
+    """Счёт только что опубликованного поста без реакций."""
+    return event_score(POST_WEIGHT, timezone.now())
+
+
+def add_event(queryset, weight, moment=None):
+    """Добавляет событие к счёту постов queryset, возвращает их число."""
+    addition = event_score(weight, moment or timezone.now())
+    updated = 0
+    with transaction.atomic():
+        rows = list(queryset.select_for_update().values_list(
+            'pk', 'trending_score'))
+        for pk, score in rows:
+            queryset.model.objects.filter(pk=pk).update(
+                trending_score=combine(score, addition))
+            updated += 1
+    return updated
+
+
+def recent_posts(post_model, author_id, moment):
+    return post_model.objects.filter(
+        author_id=author_id,
+        pub_date__gte=moment - FOLLOW_BOOST_WINDOW,
+    ).order_by('-pub_date')[:FOLLOW_BOOST_POSTS]
+
+
+def rebuild(post_model, comment_model):
+    """Пересчитывает счета всех постов по датам публикаций и комментариев.
+
+    Подписки не хранят дату, поэтому в пересчёт не входят.
+    """
+    scores = {
+        pk: event_score(POST_WEIGHT, pub_date)
+        for pk, pub_date in post_model.objects.values_list(
+            'pk', 'pub_date').iterator()
+    }
+    comments = comment_model.objects.filter(
+        post__isnull=False).values_list('post_id', 'created')
+    for post_id, created in comments.iterator():
+        scores[post_id] = combine(
+            scores[post_id], event_score(COMMENT_WEIGHT, created))
+    posts = [
+        post_model(pk=pk, trending_score=score)
+        for pk, score in scores.items()
+    ]
+    post_model.objects.bulk_update(
+        posts, ['trending_score'], batch_size=REBUILD_BATCH_SIZE)
+    return len(posts)
@@ -1,35 +1,112 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.db import transaction
 from django.shortcuts import render, get_object_or_404, redirect
+from django.template.loader import render_to_string
 
+from core import db_router
+from core.db_router import use_replicas
+
+from . import caching, search, stats, streaming, thumbnails, timeline
 from .forms import PostForm, CommentForm
 from .models import Post, Group, Comment, Follow
+from .paginators import CURSOR_PARAM, CursorPaginator
 
 User = get_user_model()
 
 LIMIT_POSTS_ON_THE_PAGE: int = 10
+LIMIT_COMMENTS_ON_THE_PAGE: int = 20
 
 
 def paginate(post_list, request):
+    if (CURSOR_PARAM in request.GET
+            or getattr(settings, 'POSTS_PAGINATION', 'page') == 'cursor'):
+        paginator = CursorPaginator(post_list, LIMIT_POSTS_ON_THE_PAGE)
+        return paginator.get_page(request.GET.get(CURSOR_PARAM))
     paginator = Paginator(post_list, LIMIT_POSTS_ON_THE_PAGE)
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
 
 
+def paginate_comments(post_id, request):
+    """Комментарии от старых к новым порциями по индексу (post, created)."""
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        'author').only('text', 'created', 'post', 'author__username')
+    paginator = CursorPaginator(
+        comments, LIMIT_COMMENTS_ON_THE_PAGE, date_field='created',
+        newest_first=False,
+    )
+    return paginator.get_page(request.GET.get(CURSOR_PARAM))
+
+
+@use_replicas
 def index(request):
-    post_list = Post.objects.select_related('group').all()
-    page_obj = paginate(post_list, request)
+    post_list = Post.objects.feed()
+    if streaming.requested(request):
+        return streaming.stream_page(request, 'posts/index.html', {},
+                                     post_list)
+    # Ключ и проверка кэша — до пагинации: при попадании не выполняются
+    # ни COUNT(*), ни выборка страницы. Закреплённый за основной базой
+    # посетитель не получает фрагмент, собранный по реплике.
+    key = caching.fragment_key(
+        'index', request.GET.get('page', ''),
+        request.GET.get(CURSOR_PARAM, ''),
+        getattr(settings, 'POSTS_PAGINATION', 'page'),
+        db_router.pinned(),
+    )
+    feed = caching.cached_fragment(key)
+    if feed is None:
+        stamps = caching.generations([
+            caching.SITE_GENERATION_KEY, caching.FEED_GENERATION_KEY,
+        ])
+        page_obj = paginate(post_list, request)
+        stamps.update(caching.generations(caching.post_keys(page_obj)))
+        feed = render_to_string('posts/includes/index_feed.html',
+                                {'page_obj': page_obj}, request)
+        # Имена авторов во фрагменте не версионируются, поэтому он живёт
+        # не дольше страниц.
+        caching.store_fragment(key, feed, stamps,
+                               caching.PAGE_CACHE_TIMEOUT)
+    return render(request, 'posts/index.html', {'feed': feed})
+
+
+@caching.cache_page_by_state
+@use_replicas
+def popular(request):
+    """Популярные посты по счёту с затуханием, см. posts/trending.py.
+
+    Курсор не замораживает порядок: поднявшиеся во время листания посты
+    пропускаются, но не повторяются.
+    """
+    caching.depend_on(request, caching.FEED_GENERATION_KEY,
+                      caching.TRENDING_GENERATION_KEY)
+    paginator = CursorPaginator(
+        Post.objects.feed(), LIMIT_POSTS_ON_THE_PAGE,
+        date_field='trending_score',
+    )
+    page_obj = paginator.get_page(request.GET.get(CURSOR_PARAM))
+    caching.depend_on_posts(request, page_obj)
     context = {
         'page_obj': page_obj,
     }
-    return render(request, 'posts/index.html', context)
+    return render(request, 'posts/popular.html', context)
 
 
+@caching.cache_page_by_state
+@use_replicas
 def group_list(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
+    caching.depend_on(request, caching.group_key(group.pk))
+    post_list = group.posts.feed()
+    if streaming.requested(request):
+        return streaming.stream_page(
+            request, 'posts/group_list.html', {'group': group}, post_list,
+            show_group_link=False,
+        )
     page_obj = paginate(post_list, request)
+    caching.depend_on_posts(request, page_obj)
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -37,11 +114,15 @@ def group_list(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@caching.cache_page_by_state
+@use_replicas
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = Post.objects.filter(author=author).order_by('-pub_date')
-    page_obj = paginate(post_list, request)
-    posts_count = Post.objects.filter(author=author).count()
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    caching.depend_on(request, caching.author_key(author.pk))
+    post_list = Post.objects.feed().filter(author=author)
+    posts_count = stats.get_stats(author).posts_count
     if request.user.is_authenticated:
         following = Follow.objects.filter(
             user=request.user).filter(
@@ -51,17 +132,40 @@ def profile(request, username):
         following = False
     context = {
         'author': author,
-        'page_obj': page_obj,
         'posts_count': posts_count,
         'following': following
     }
+    if streaming.requested(request):
+        return streaming.stream_page(
+            request, 'posts/profile.html', context, post_list
+        )
+    context['page_obj'] = paginate(post_list, request)
+    caching.depend_on_posts(request, context['page_obj'])
     return render(request, 'posts/profile.html', context)
 
 
+@use_replicas
+def post_search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = search.search_page(query, request.GET.get('page'))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@caching.cache_page_by_state
+@use_replicas
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    comments = Comment.objects.filter(post=post)
-    posts_count = post.author.posts.count()
+    caching.depend_on(request, caching.post_key(post_id))
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats'), pk=post_id
+    )
+    caching.depend_on_posts(request, [post])
+    caching.depend_on(request, caching.author_key(post.author_id))
+    comments = paginate_comments(post.pk, request)
+    posts_count = stats.get_stats(post.author).posts_count
     form = CommentForm()
     context = {
         'post': post,
@@ -72,6 +176,18 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+@caching.cache_page_by_state
+@use_replicas
+def post_comments(request, post_id):
+    caching.depend_on(request, caching.post_key(post_id))
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    context = {
+        'post': post,
+        'comments': paginate_comments(post.pk, request),
+    }
+    return render(request, 'posts/includes/comments.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(request.POST or None,
@@ -82,7 +198,9 @@ def post_create(request):
         return render(request, 'posts/create_post.html', {'form': form})
     post = form.save(commit=False)
     post.author = request.user
-    form.save()
+    with transaction.atomic():
+        form.save()
+        thumbnails.schedule(post)
     return redirect('posts:profile', post.author)
 
 
@@ -104,7 +222,14 @@ def post_edit(request, post_id):
             'post': post,
         }
         return render(request, 'posts/create_post.html', context)
-    post.save()
+    image_changed = 'image' in form.changed_data
+    if image_changed:
+        post.thumbnail = ''
+        post.image_variants = ''
+    with transaction.atomic():
+        post.save()
+        if image_changed:
+            thumbnails.schedule(post)
     return redirect('posts:post_detail', post.pk)
 
 
@@ -116,14 +241,16 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        with transaction.atomic():
+            comment.save()
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
+@use_replicas
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    page_obj = paginate(post_list, request)
+    post_list = timeline.follow_feed(request.user)
+    page_obj = timeline.as_posts(paginate(post_list, request))
     context = {
         'page_obj': page_obj,
     }
@@ -135,7 +262,8 @@ def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     user = request.user
     if user != author:
-        Follow.objects.get_or_create(user=user, author=author)
+        with transaction.atomic():
+            Follow.objects.get_or_create(user=user, author=author)
     return redirect('posts:profile', username=username)
 
 
@@ -143,5 +271,6 @@ def profile_follow(request, username):
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     user = request.user
-    Follow.objects.filter(user=user, author=author).delete()
+    with transaction.atomic():
+        Follow.objects.filter(user=user, author=author).delete()
     return redirect('posts:profile', username=username)
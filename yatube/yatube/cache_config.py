@@ -0,0 +1,140 @@
+"""Настройка кэшей из переменных окружения.
+
+YATUBE_CACHE_BACKEND выбирает бэкенд для всех псевдонимов:
+
+* ``locmem`` (по умолчанию) — память процесса, у каждого воркера свой кэш;
+* ``file`` — FileBasedCache, общий для воркеров одной машины и не требующий
+  сетевых сервисов; YATUBE_CACHE_LOCATION задаёт корневой каталог;
+* ``memcached`` — адреса ``host:port`` через запятую или сокет
+  ``unix:/path/memcached.sock`` (нужен пакет python-memcached);
+* ``redis`` — URL вида ``redis://host:6379/0`` (нужен пакет django-redis).
+
+Клиенты memcached и Redis не входят в requirements.txt и ставятся из
+requirements-cache.txt.
+
+Псевдонимы получают свои префиксы ключей, TTL и политику вытеснения.
+У memcached и Redis вытеснение настраивается на сервере, поэтому для
+раздельных политик каждому псевдониму можно указать свой адрес через
+YATUBE_CACHE_LOCATION_<ALIAS>, например отдельную базу Redis.
+
+YATUBE_SESSION_BACKEND выбирает хранилище сессий: ``cached_db``
+(по умолчанию) читает сессию из кэша ``sessions`` и обращается к таблице
+django_session только при промахе, ``signed_cookies`` хранит сессию в
+подписанной cookie и не обращается к серверу вовсе.
+
+instrument_caches() оборачивает каждый псевдоним в
+core.backends.cache.InstrumentedCache, который считает попадания
+и промахи для Server-Timing и /metrics.
+"""
+import os
+import tempfile
+
+from django.core.exceptions import ImproperlyConfigured
+
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'memcached': 'django.core.cache.backends.memcached.MemcachedCache',
+    'redis': 'django_redis.cache.RedisCache',
+}
+
+DEFAULT_LOCATIONS = {
+    'file': os.path.join(tempfile.gettempdir(), 'yatube-cache'),
+    'memcached': '127.0.0.1:11211',
+    'redis': 'redis://127.0.0.1:6379/0',
+}
+
+# TIMEOUT и вытеснение для каждого псевдонима. Сессии вытесняются
+# понемногу, чтобы переполнение не разлогинивало сразу треть
+# пользователей; миниатюры sorl хранятся без срока.
+CACHE_ALIASES = {
+    'default': {
+        'TIMEOUT': 60 * 5,
+        'OPTIONS': {'MAX_ENTRIES': 10000, 'CULL_FREQUENCY': 3},
+    },
+    'fragments': {
+        'TIMEOUT': 60 * 60 * 6,
+        'OPTIONS': {'MAX_ENTRIES': 50000, 'CULL_FREQUENCY': 4},
+    },
+    'sessions': {
+        'TIMEOUT': 60 * 60 * 24 * 14,
+        'OPTIONS': {'MAX_ENTRIES': 100000, 'CULL_FREQUENCY': 10},
+    },
+    'thumbnails': {
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 20000, 'CULL_FREQUENCY': 3},
+    },
+}
+
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+
+
+def _location(backend, alias, environ):
+    location = environ.get(f'YATUBE_CACHE_LOCATION_{alias.upper()}')
+    if location:
+        return location
+    if backend == 'locmem':
+        return alias
+    location = environ.get('YATUBE_CACHE_LOCATION',
+                           DEFAULT_LOCATIONS[backend])
+    if backend == 'file':
+        return os.path.join(location, alias)
+    if backend == 'memcached':
+        return location.split(',')
+    return location
+
+
+def build_caches(environ=None):
+    """Словарь для settings.CACHES по переменным окружения."""
+    if environ is None:
+        environ = os.environ
+    backend = environ.get('YATUBE_CACHE_BACKEND', 'locmem')
+    if backend not in CACHE_BACKENDS:
+        raise ImproperlyConfigured(
+            f'Неизвестный бэкенд кэша: {backend}. '
+            f'Допустимо: {", ".join(CACHE_BACKENDS)}'
+        )
+    caches = {}
+    for alias, policy in CACHE_ALIASES.items():
+        config = {
+            'BACKEND': CACHE_BACKENDS[backend],
+            'LOCATION': _location(backend, alias, environ),
+            'KEY_PREFIX': f'yatube:{alias}',
+            'TIMEOUT': policy['TIMEOUT'],
+        }
+        if backend in ('locmem', 'file'):
+            config['OPTIONS'] = dict(policy['OPTIONS'])
+        caches[alias] = config
+    return caches
+
+
+INSTRUMENTED_CACHE = 'core.backends.cache.InstrumentedCache'
+
+
+def instrument_caches(caches):
+    """Те же кэши за обёрткой, считающей попадания и промахи."""
+    instrumented = {}
+    for alias, config in caches.items():
+        options = dict(config.get('OPTIONS', {}))
+        options.update(BACKEND=config['BACKEND'], ALIAS=alias)
+        instrumented[alias] = dict(
+            config, BACKEND=INSTRUMENTED_CACHE, OPTIONS=options)
+    return instrumented
+
+
+def session_engine(environ=None):
+    """Значение settings.SESSION_ENGINE по переменной окружения."""
+    if environ is None:
+        environ = os.environ
+    backend = environ.get('YATUBE_SESSION_BACKEND', 'cached_db')
+    if backend not in SESSION_ENGINES:
+        raise ImproperlyConfigured(
+            f'Неизвестное хранилище сессий: {backend}. '
+            f'Допустимо: {", ".join(SESSION_ENGINES)}'
+        )
+    return SESSION_ENGINES[backend]
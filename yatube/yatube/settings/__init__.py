@@ -0,0 +1,16 @@
+"""Настройки для окружения из переменной YATUBE_ENV: dev (по умолчанию)
+или prod."""
+import os
+
+YATUBE_ENV = os.environ.get('YATUBE_ENV', 'dev')
+
+if YATUBE_ENV == 'prod':
+    from .prod import *  # noqa: F401,F403
+elif YATUBE_ENV == 'dev':
+    from .dev import *  # noqa: F401,F403
+else:
+    from django.core.exceptions import ImproperlyConfigured
+    raise ImproperlyConfigured(
+        f'Неизвестное окружение YATUBE_ENV={YATUBE_ENV}: ожидается dev '
+        f'или prod'
+    )
@@ -0,0 +1,224 @@
+"""
+Django settings for yatube project.
+
+Общие настройки. Окружение выбирается переменной YATUBE_ENV
+(см. settings/__init__.py): dev.py и prod.py дополняют этот модуль.
+
+Generated by 'django-admin startproject' using Django 2.2.19.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/2.2/topics/settings/
+
+For the full list of settings and their values, see
+https://docs.djangoproject.com/en/2.2/ref/settings/
+"""
+
+import os
+
+from ..cache_config import build_caches, instrument_caches, session_engine
+
+# Build paths inside the project like this: os.path.join(BASE_DIR, ...)
+BASE_DIR = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
+
+# Quick-start development settings - unsuitable for production
+# See https://docs.djangoproject.com/en/2.2/howto/deployment/checklist/
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = 'xyu51be3s9#qv6*!-0%vrj9q#&uq#se@e7nn-(bz+@5)(@1^%('
+
+# SECURITY WARNING: don't run with debug turned on in production!
+DEBUG = False
+
+ALLOWED_HOSTS = [
+    'localhost',
+    '127.0.0.1',
+    '[::1]',
+    'testserver',
+]
+
+
+# Application definition
+
+INSTALLED_APPS = [
+    'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
+    'core.apps.CoreConfig',
+    'posts.apps.PostsConfig',
+    'users.apps.UsersConfig',
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'sorl.thumbnail',
+]
+
+MIDDLEWARE = [
+    'core.middleware.ServerTimingMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ReplicaPinningMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+ROOT_URLCONF = 'yatube.urls'
+
+TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+TEMPLATES = [
+    {
+        # DjangoTemplates с учётом времени рендеринга в метриках запроса
+        'BACKEND': 'core.backends.templates.DjangoTemplates',
+        'NAME': 'django',
+        'DIRS': [TEMPLATES_DIR],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+                'core.context_processors.year.year',
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = 'yatube.wsgi.application'
+
+# Компилировать все шаблоны при загрузке WSGI-приложения
+# (имеет смысл только с кэширующим загрузчиком).
+TEMPLATES_WARM_UP = False
+
+# True — фоновые задачи выполняются сразу в запросе (разработка и тесты),
+# False — ставятся в очередь для manage.py run_worker.
+TASKS_EAGER = True
+
+
+# Database
+# https://docs.djangoproject.com/en/2.2/ref/settings/#databases
+
+# core.backends.sqlite3 включает WAL и прочие PRAGMA при подключении;
+# их можно переопределить в OPTIONS['pragmas'], а режим BEGIN —
+# в OPTIONS['transaction_mode'].
+DATABASES = {
+    'default': {
+        'ENGINE': 'core.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'OPTIONS': {
+            'pragmas': {
+                'busy_timeout': 5000,
+                'mmap_size': 268435456,
+            },
+        },
+    }
+}
+
+# Реплики только для чтения: пути к файлам SQLite через запятую
+# в YATUBE_DB_REPLICAS. Локально их наполняет manage.py sync_replicas.
+DATABASE_REPLICAS = []
+for number, path in enumerate(
+        filter(None, os.environ.get('YATUBE_DB_REPLICAS', '').split(','))):
+    alias = f'replica_{number}'
+    DATABASES[alias] = {
+        'ENGINE': 'core.backends.sqlite3',
+        'NAME': f'file:{path}?mode=ro',
+        'OPTIONS': {'pragmas': {'journal_mode': None}},
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+# Сколько секунд после записи посетитель читает только с основной базы.
+REPLICA_PIN_SECONDS = 5
+
+# Доступ Prometheus к /metrics без входа на сайт: по токену
+# (Authorization: Bearer ...) или с адресов из списка. Список сверяется
+# с REMOTE_ADDR, поэтому за nginx на той же машине он бесполезен и опасен:
+# все запросы приходят с 127.0.0.1.
+METRICS_TOKEN = ''
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
+
+# Password validation
+# https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+
+# Internationalization
+# https://docs.djangoproject.com/en/2.2/topics/i18n/
+
+LANGUAGE_CODE = 'ru'
+
+TIME_ZONE = 'UTC'
+
+USE_I18N = True
+
+USE_L10N = True
+
+USE_TZ = True
+
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/2.2/howto/static-files/
+
+STATIC_URL = '/static/'
+STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+
+
+LOGIN_URL = 'users:login'
+LOGIN_REDIRECT_URL = 'posts:index'
+# LOGOUT_REDIRECT_URL = 'posts:index'
+
+
+EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+
+
+CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+
+# 'page' — нумерованные страницы, 'cursor' — keyset-пагинация без OFFSET
+POSTS_PAGINATION = 'page'
+
+
+# Бэкенд и адреса задаются переменными YATUBE_CACHE_*,
+# см. yatube/cache_config.py
+CACHES = instrument_caches(build_caches())
+# Хранилище сессий выбирает YATUBE_SESSION_BACKEND
+SESSION_ENGINE = session_engine()
+SESSION_CACHE_ALIAS = 'sessions'
+# Пользователь из сессии берётся из кэша, а не из auth_user на каждый запрос
+# (только с общим для воркеров кэшем, см. core/backends/auth.py).
+# ModelBackend остаётся для сессий, созданных до CachedModelBackend:
+# в них записан его путь, и без него такие пользователи разлогинились бы.
+AUTHENTICATION_BACKENDS = [
+    'core.backends.auth.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+THUMBNAIL_CACHE = 'thumbnails'
@@ -0,0 +1,28 @@
+"""Локальная разработка: отладка включена, всё работает без сервисов."""
+import importlib.util
+import os
+
+from .base import *  # noqa: F401,F403
+from .base import INSTALLED_APPS, MIDDLEWARE
+
+DEBUG = True
+
+# Повторяющиеся за ответ запросы (N+1) пишутся в лог core.middleware.
+MIDDLEWARE = MIDDLEWARE[:1] + [
+    'core.middleware.QueryInspectorMiddleware',
+] + MIDDLEWARE[1:]
+QUERY_INSPECTOR_THRESHOLD = 5
+
+# Миниатюры строятся в потоке запроса после коммита: фоновый поток
+# переживал бы тест и писал во временный MEDIA_ROOT после его удаления.
+POSTS_THUMBNAIL_WORKERS = 0
+
+# django-debug-toolbar подключается только по явному запросу
+# и только если пакет установлен.
+if (os.environ.get('YATUBE_DEBUG_TOOLBAR') == '1'
+        and importlib.util.find_spec('debug_toolbar') is not None):
+    INSTALLED_APPS = INSTALLED_APPS + ['debug_toolbar']
+    MIDDLEWARE = [
+        'debug_toolbar.middleware.DebugToolbarMiddleware'
+    ] + MIDDLEWARE
+    INTERNAL_IPS = ['127.0.0.1']
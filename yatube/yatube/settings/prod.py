@@ -0,0 +1,60 @@
+"""Боевое окружение: значения, зависящие от развёртывания, берутся
+из переменных окружения."""
+import copy
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .base import *  # noqa: F401,F403
+from .base import BASE_DIR, DATABASES, MIDDLEWARE, TEMPLATES
+
+
+def env(name, default=None):
+    value = os.environ.get(name, default)
+    if value is None:
+        raise ImproperlyConfigured(f'Не задана переменная окружения {name}')
+    return value
+
+
+DEBUG = False
+
+SECRET_KEY = env('YATUBE_SECRET_KEY')
+
+ALLOWED_HOSTS = env('YATUBE_ALLOWED_HOSTS').split(',')
+
+DATABASES = copy.deepcopy(DATABASES)
+TEMPLATES = copy.deepcopy(TEMPLATES)
+
+# Постоянные соединения вместо нового подключения на каждый запрос.
+# Реплики из YATUBE_DB_REPLICAS держат соединения так же, как основная база.
+for database in DATABASES.values():
+    database['CONN_MAX_AGE'] = int(env('YATUBE_CONN_MAX_AGE', '60'))
+
+# Шаблоны разбираются один раз на процесс.
+TEMPLATES[0]['APP_DIRS'] = False
+TEMPLATES[0]['OPTIONS']['loaders'] = [
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+TEMPLATES_WARM_UP = True
+
+TASKS_EAGER = env('YATUBE_TASKS_EAGER', '0') == '1'
+
+STATIC_ROOT = env(
+    'YATUBE_STATIC_ROOT', os.path.join(BASE_DIR, 'collected_static'))
+STATICFILES_STORAGE = (
+    'django.contrib.staticfiles.storage.ManifestStaticFilesStorage'
+)
+
+MIDDLEWARE = ['django.middleware.gzip.GZipMiddleware'] + MIDDLEWARE
+
+# За обратным прокси все запросы приходят с 127.0.0.1, поэтому адреса
+# по умолчанию не доверяются; Prometheus передаёт YATUBE_METRICS_TOKEN.
+METRICS_TOKEN = env('YATUBE_METRICS_TOKEN', '')
+METRICS_ALLOWED_IPS = list(filter(
+    None, env('YATUBE_METRICS_ALLOWED_IPS', '').split(',')))
+
+SESSION_COOKIE_SECURE = env('YATUBE_SECURE_COOKIES', '1') == '1'
+CSRF_COOKIE_SECURE = SESSION_COOKIE_SECURE
@@ -0,0 +1,97 @@
+import os
+import tempfile
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase
+
+from core import metrics
+from core.backends.cache import InstrumentedCache
+
+from ..cache_config import (CACHE_ALIASES, build_caches, instrument_caches,
+                            session_engine)
+
+
+class CacheConfigTests(SimpleTestCase):
+    def test_locmem_by_default(self):
+        """Без переменных окружения у каждого псевдонима свой LocMemCache."""
+        caches = build_caches({})
+        self.assertEqual(set(caches), set(CACHE_ALIASES))
+        locations = {config['LOCATION'] for config in caches.values()}
+        self.assertEqual(len(locations), len(caches))
+        self.assertEqual(
+            caches['sessions']['OPTIONS']['CULL_FREQUENCY'], 10
+        )
+        self.assertIsNone(caches['thumbnails']['TIMEOUT'])
+
+    def test_file_backend_is_shared_between_processes(self):
+        """Файловый кэш раскладывает псевдонимы по подкаталогам."""
+        with tempfile.TemporaryDirectory() as root:
+            caches = build_caches({
+                'YATUBE_CACHE_BACKEND': 'file',
+                'YATUBE_CACHE_LOCATION': root,
+            })
+            config = caches['fragments']
+            self.assertEqual(config['LOCATION'],
+                             os.path.join(root, 'fragments'))
+            # Два независимых экземпляра видят одни и те же записи,
+            # как два воркера gunicorn.
+            writer = FileBasedCache(config['LOCATION'], config)
+            reader = FileBasedCache(config['LOCATION'], config)
+            writer.set('index_page', 'html')
+            self.assertEqual(reader.get('index_page'), 'html')
+
+    def test_shared_backends_use_server_eviction(self):
+        """Для memcached и Redis адреса задаются по псевдонимам."""
+        caches = build_caches({
+            'YATUBE_CACHE_BACKEND': 'memcached',
+            'YATUBE_CACHE_LOCATION': 'unix:/tmp/memcached.sock',
+        })
+        self.assertEqual(caches['default']['LOCATION'],
+                         ['unix:/tmp/memcached.sock'])
+        self.assertNotIn('OPTIONS', caches['default'])
+        caches = build_caches({
+            'YATUBE_CACHE_BACKEND': 'redis',
+            'YATUBE_CACHE_LOCATION_SESSIONS': 'redis://cache:6379/2',
+        })
+        self.assertEqual(caches['sessions']['LOCATION'],
+                         'redis://cache:6379/2')
+        self.assertEqual(caches['default']['LOCATION'],
+                         'redis://127.0.0.1:6379/0')
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ImproperlyConfigured):
+            build_caches({'YATUBE_CACHE_BACKEND': 'mongo'})
+
+    def test_instrumented_cache_counts_lookups(self):
+        """Обёртка передаёт бэкенду его параметры и считает чтения."""
+        config = instrument_caches(build_caches({}))['fragments']
+        self.assertEqual(config['OPTIONS']['CULL_FREQUENCY'], 4)
+        cache = InstrumentedCache(config['LOCATION'], config)
+        self.assertEqual(cache._cache._cull_frequency, 4)
+        request_metrics = metrics.start()
+        try:
+            cache.set('index_page', 'html')
+            self.assertEqual(cache.get('index_page'), 'html')
+            self.assertEqual(cache.get('missing', 'default'), 'default')
+            cache.get_many(['index_page', 'missing'])
+        finally:
+            metrics.finish()
+        self.assertEqual(dict(request_metrics.cache),
+                         {('fragments', True): 2, ('fragments', False): 2})
+
+
+class SessionEngineTests(SimpleTestCase):
+    def test_cached_db_by_default(self):
+        self.assertEqual(session_engine({}),
+                         'django.contrib.sessions.backends.cached_db')
+
+    def test_signed_cookies(self):
+        self.assertEqual(
+            session_engine({'YATUBE_SESSION_BACKEND': 'signed_cookies'}),
+            'django.contrib.sessions.backends.signed_cookies',
+        )
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ImproperlyConfigured):
+            session_engine({'YATUBE_SESSION_BACKEND': 'files'})
@@ -18,6 +18,8 @@ from django.urls import include, path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core import views as core_views
+
 
 urlpatterns = [
     path('', include('posts.urls', namespace='posts')),
@@ -25,6 +27,8 @@ urlpatterns = [
     path('auth/', include('users.urls', namespace='users')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path('api/v1/', include('api.urls', namespace='api')),
+    path('metrics', core_views.metrics, name='metrics'),
 ]
 
 handler404 = 'core.views.page_not_found'
@@ -14,3 +14,12 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+# С gunicorn --preload шаблоны компилируются один раз до fork,
+# и воркеры получают готовый кэш загрузчика.
+from django.conf import settings  # noqa: E402
+
+if settings.TEMPLATES_WARM_UP:
+    from core.template_warmup import warm_up  # noqa: E402
+
+    warm_up()